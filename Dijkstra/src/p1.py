@@ -1,11 +1,63 @@
-
+import sys
+from collections import defaultdict
 from queue import PriorityQueue
 
-from p1_support import load_level, show_level, save_level_costs
+from p1_support import load_level, show_level, save_level_costs, cell_index, index_cell, NEIGHBOR_STEPS
+from p1_support import distance_cache_key, load_distance_field, store_distance_field
 from math import inf, sqrt
 from heapq import heappop, heappush
 
-def dijkstras_shortest_path(initial_position, destination, graph, adj):
+
+class HeapFrontier:
+    """ The default Dijkstra frontier: a binary heap of (priority, cell) entries. """
+
+    def __init__(self, graph):
+        self.entries = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def push(self, priority, cell):
+        heappush(self.entries, (priority, cell))
+
+    def pop(self):
+        return heappop(self.entries)
+
+
+class BucketFrontier:
+    """ Dial's bucket queue: (priority, cell) entries are filed into buckets as wide as the level's cheapest cell.
+
+    No edge costs less than that width, so nothing left in the lowest bucket can improve a cell popped from it, and
+    entries can leave a bucket in any order without changing the resulting costs.
+    """
+
+    def __init__(self, graph):
+        self.width = graph['min_cost'] or 1.
+        self.buckets = defaultdict(list)
+        self.lowest = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, priority, cell):
+        self.buckets[int(priority / self.width)].append((priority, cell))
+        self.size += 1
+
+    def pop(self):
+        while not self.buckets[self.lowest]:
+            del self.buckets[self.lowest]
+            self.lowest += 1
+        self.size -= 1
+        return self.buckets[self.lowest].pop()
+
+
+# Frontier implementations selectable by both Dijkstra searches.
+FRONTIERS = {'heap': HeapFrontier,
+             'bucket': BucketFrontier}
+
+
+def dijkstras_shortest_path(initial_position, destination, graph, adj, stats=None, frontier='heap'):
     """ Searches for a minimal cost path through a graph using Dijkstra's algorithm.
 
     Args:
@@ -13,32 +65,35 @@ def dijkstras_shortest_path(initial_position, destination, graph, adj):
         destination: The end location for the path.
         graph: A loaded level, containing walls, spaces, and waypoints.
         adj: An adjacency function returning cells adjacent to a given cell as well as their respective edge costs.
+        stats: If given, a dictionary filled with the search's 'expanded', 'pushed' and 'stale' counts.
+        frontier: The name of the priority queue to use, one of FRONTIERS.
 
     Returns:
         If a path exits, return a list containing all cells from initial_position to destination.
         Otherwise, return None.
 
     """
-    #print('dest ' + str(destination))
-    frontier = []
-    heappush(frontier, (0, initial_position))  #add initial
+    queue = FRONTIERS[frontier](graph)
+    push, pop = queue.push, queue.pop
+    push(0, initial_position)  #add initial
     came_from = {}
     cost_so_far = {}
     came_from[initial_position] = None
     cost_so_far[initial_position] = 0
+    expanded, pushed, stale = 0, 1, 0
 
-    while len(frontier) is not 0:
-        #print('frontier ' + str(list(frontier)))
-        current = heappop(frontier)[1] # current node coor
-
-        #print('current ' + str(current))
+    try:
+        while queue:
+            current_cost, current = pop()
 
-        if current == destination:
+            # A cheaper entry for this cell was pushed after this one and has already been expanded.
+            if current_cost > cost_so_far[current]:
+                stale += 1
+                continue
 
-            path = []
-            # Path found building it, else return empty path
-            node = current
-            if node == destination:
+            if current == destination:
+                path = []
+                node = current
                 # Go back to the top
                 while node is not None:  # while there is a parent (prev[initial_position] = None)
                     path.append(node)
@@ -46,52 +101,335 @@ def dijkstras_shortest_path(initial_position, destination, graph, adj):
                 # Path is from dst to src, reverse it
                 path.reverse()
                 print('total cost: {} '.format(cost_so_far[current]))
-            return path
+                return path
 
-        for next_cor in adj(graph, current):
-            new_cost = cost_so_far[current] + next_cor[1]
-            if next_cor[0] not in cost_so_far or new_cost < cost_so_far[next_cor[0]]:
-                cost_so_far[next_cor[0]] = new_cost
-                priority = new_cost
+            expanded += 1
+            for next_cell, edge_cost in adj(graph, current):
+                new_cost = current_cost + edge_cost
+                if next_cell not in cost_so_far or new_cost < cost_so_far[next_cell]:
+                    cost_so_far[next_cell] = new_cost
+                    came_from[next_cell] = current
+                    push(new_cost, next_cell)
+                    pushed += 1
+    finally:
+        if stats is not None:
+            stats.update(expanded=expanded, pushed=pushed, stale=stale)
 
-                heappush(frontier, (priority, next_cor[0]))
 
-                came_from[next_cor[0]] = current
-                #for key, value in came_from.items():
-                    #print(key, ' : ', value)
+def a_star_shortest_path(initial_position, destination, graph, adj, heuristic=None, stats=None):
+    """ Searches for a minimal cost path through a graph using A*.
 
-def dijkstras_shortest_path_to_all(initial_position, graph, adj):
-    """ Calculates the minimum cost to every reachable cell in a graph from the initial_position.
+    Args:
+        initial_position: The initial cell from which the path extends.
+        destination: The end location for the path.
+        graph: A loaded level, containing walls, spaces, and waypoints.
+        adj: An adjacency function returning cells adjacent to a given cell as well as their respective edge costs.
+        heuristic: A function (graph, cell, destination) returning a lower bound on the remaining path cost.
+            Defaults to octile_heuristic, which expects cells given as flat indices.
+        stats: If given, a dictionary filled with the search's 'expanded', 'pushed' and 'stale' counts.
+
+    Returns:
+        If a path exits, return a list containing all cells from initial_position to destination.
+        Otherwise, return None.
+
+    """
+    if heuristic is None:
+        heuristic = octile_heuristic
+
+    frontier = []
+    heappush(frontier, (heuristic(graph, initial_position, destination), initial_position))
+    came_from = {}
+    cost_so_far = {}
+    came_from[initial_position] = None
+    cost_so_far[initial_position] = 0
+    closed = set()
+    expanded, pushed, stale = 0, 1, 0
+
+    try:
+        while frontier:
+            current = heappop(frontier)[1]
+            if current in closed:
+                stale += 1
+                continue
+            closed.add(current)
+
+            if current == destination:
+                path = []
+                node = current
+                while node is not None:
+                    path.append(node)
+                    node = came_from[node]
+                path.reverse()
+                print('total cost: {} '.format(cost_so_far[current]))
+                return path
+
+            expanded += 1
+            for next_cell, edge_cost in adj(graph, current):
+                new_cost = cost_so_far[current] + edge_cost
+                if next_cell not in closed and (next_cell not in cost_so_far or new_cost < cost_so_far[next_cell]):
+                    cost_so_far[next_cell] = new_cost
+                    came_from[next_cell] = current
+                    heappush(frontier, (new_cost + heuristic(graph, next_cell, destination), next_cell))
+                    pushed += 1
+    finally:
+        if stats is not None:
+            stats.update(expanded=expanded, pushed=pushed, stale=stale)
+
+
+def octile_heuristic(level, index, destination):
+    """ Estimates the cost between two cells as the octile distance scaled by the cheapest cell in the level.
+
+    Every step costs at least its length times the level's minimum cell cost, so the estimate never exceeds
+    the true path cost.
+
+    Args:
+        level: A loaded level, containing its width and minimum cell cost.
+        index: The flat index of the cell being estimated.
+        destination: The flat index of the destination cell.
+
+    Returns:
+        A lower bound on the cost of any path from index to destination.
+    """
+    width = level['width']
+    dx = abs(index % width - destination % width)
+    dy = abs(index // width - destination // width)
+    return level['min_cost'] * (max(dx, dy) + (sqrt(2) - 1) * min(dx, dy))
+
+
+def bidirectional_shortest_path(initial_position, destination, graph, adj, stats=None):
+    """ Searches for a minimal cost path through a graph by running Dijkstra's algorithm from both ends at once.
+
+    Edge costs in a level are symmetric, so the backward search uses the same adjacency function. Whichever side has
+    the cheaper frontier is expanded next, and the search stops once the two frontiers together cost at least as
+    much as the best path found through a cell both sides have reached.
 
     Args:
         initial_position: The initial cell from which the path extends.
+        destination: The end location for the path.
         graph: A loaded level, containing walls, spaces, and waypoints.
         adj: An adjacency function returning cells adjacent to a given cell as well as their respective edge costs.
+        stats: If given, a dictionary filled with the search's 'expanded', 'expanded_forward', 'expanded_backward',
+            'pushed' and 'stale' counts.
 
     Returns:
-        A dictionary, mapping destination cells to the cost of a path from the initial_position.
+        If a path exits, return a list containing all cells from initial_position to destination.
+        Otherwise, return None.
+
     """
-    pass
+    # Index 0 holds the forward search from initial_position, index 1 the backward search from destination.
+    frontiers = ([(0, initial_position)], [(0, destination)])
+    costs = ({initial_position: 0}, {destination: 0})
+    came_from = ({initial_position: None}, {destination: None})
+    expanded, pushed, stale = [0, 0], 2, 0
+
+    best_cost, meeting = (0, initial_position) if initial_position == destination else (inf, None)
+
+    while frontiers[0] and frontiers[1] and frontiers[0][0][0] + frontiers[1][0][0] < best_cost:
+        side = 0 if frontiers[0][0][0] <= frontiers[1][0][0] else 1
+        current_cost, current = heappop(frontiers[side])
+        if current_cost > costs[side][current]:
+            stale += 1
+            continue
+
+        expanded[side] += 1
+        for next_cell, edge_cost in adj(graph, current):
+            new_cost = current_cost + edge_cost
+            if next_cell not in costs[side] or new_cost < costs[side][next_cell]:
+                costs[side][next_cell] = new_cost
+                came_from[side][next_cell] = current
+                heappush(frontiers[side], (new_cost, next_cell))
+                pushed += 1
+
+                if next_cell in costs[1 - side] and new_cost + costs[1 - side][next_cell] < best_cost:
+                    best_cost, meeting = new_cost + costs[1 - side][next_cell], next_cell
+
+    if stats is not None:
+        stats.update(expanded=sum(expanded), expanded_forward=expanded[0], expanded_backward=expanded[1],
+                     pushed=pushed, stale=stale)
+
+    if meeting is None:
+        return None
+
+    path = []
+    node = meeting
+    while node is not None:
+        path.append(node)
+        node = came_from[0][node]
+    path.reverse()
+    node = came_from[1][meeting]
+    while node is not None:
+        path.append(node)
+        node = came_from[1][node]
+    print('total cost: {} '.format(best_cost))
+    return path
+
+
+def jump_point_search(initial_position, destination, graph, adj=None, stats=None):
+    """ Searches for a minimal cost path through a level with Jump Point Search, an A* variant that skips across
+    open floor instead of expanding every cell of it.
+
+    Where a cell and all of its open neighbors share one cost, moves are pruned by the usual JPS rules, with walls
+    and the level's edges producing forced neighbors. A cell next to a different cost stops every jump as a jump
+    point and is expanded in all eight directions, so the search falls back to plain A* wherever costs vary.
 
-    graph_cost = {}
-    for cell in graph['spaces'].keys():
-        path =dijkstras_shortest_path(initial_position, cell, graph, adj)
-        if path:
-            #get cost
-        else:
-            graph_cost[cell] = 'inf'
-    for cell in graph['waypoints'].values():
-        path =dijkstras_shortest_path(initial_position, cell, graph, adj)
-        if path:
-            #get cost
+    Args:
+        initial_position: The flat index of the initial cell.
+        destination: The flat index of the destination cell.
+        graph: A loaded level, containing its width, height, flat cell costs and minimum cell cost.
+        adj: Unused; jumps step over the level's cells directly. Accepted so the search fits ROUTE_ALGORITHMS.
+        stats: If given, a dictionary filled with the search's 'expanded' (jump points), 'scanned' (cells stepped
+            over while jumping), 'pushed' and 'stale' counts.
+
+    Returns:
+        If a path exits, return a list containing all cells from initial_position to destination.
+        Otherwise, return None.
+
+    """
+    width, height, costs = graph['width'], graph['height'], graph['costs']
+    uniform_cells = {}
+    scanned = 0
+
+    def is_open(x, y):
+        return 0 <= x < width and 0 <= y < height and costs[y * width + x] > 0.
+
+    def is_uniform(x, y):
+        index = y * width + x
+        if index not in uniform_cells:
+            uniform_cells[index] = all(not is_open(x + dx, y + dy) or costs[(y + dy) * width + x + dx] == costs[index]
+                                       for dx, dy, _ in NEIGHBOR_STEPS)
+        return uniform_cells[index]
+
+    def forced(x, y, dx, dy):
+        """ Lists the moves out of (x, y) that walls force, when it was entered moving (dx, dy). """
+        if dx and dy:
+            candidates = ((-dx, 0, -dx, dy), (0, -dy, dx, -dy))
+        elif dx:
+            candidates = ((0, 1, dx, 1), (0, -1, dx, -1))
         else:
-            graph_cost[cell] = 'inf'
-    for cell in graph['walls']:
-        path =dijkstras_shortest_path(initial_position, cell, graph, adj)
-        if path:
-            #get cost
+            candidates = ((1, 0, 1, dy), (-1, 0, -1, dy))
+        return [(mx, my) for bx, by, mx, my in candidates if not is_open(x + bx, y + by) and is_open(x + mx, y + my)]
+
+    def jump(x, y, dx, dy):
+        """ Steps from (x, y) in direction (dx, dy) until reaching a jump point, returning it and its cost. """
+        nonlocal scanned
+        factor = NEIGHBOR_STEPS[4][2] if dx and dy else NEIGHBOR_STEPS[0][2]
+        cost = 0.
+        while is_open(x + dx, y + dy):
+            cost += factor * (costs[y * width + x] + costs[(y + dy) * width + x + dx])
+            x, y = x + dx, y + dy
+            scanned += 1
+
+            if y * width + x == destination or not is_uniform(x, y) or forced(x, y, dx, dy):
+                return y * width + x, cost
+            if dx and dy and (jump(x, y, dx, 0) or jump(x, y, 0, dy)):
+                return y * width + x, cost
+        return None
+
+    frontier = []
+    heappush(frontier, (octile_heuristic(graph, initial_position, destination), initial_position))
+    came_from = {}
+    cost_so_far = {}
+    came_from[initial_position] = None
+    cost_so_far[initial_position] = 0
+    closed = set()
+    expanded, pushed, stale = 0, 1, 0
+    path = None
+
+    while frontier:
+        current = heappop(frontier)[1]
+        if current in closed:
+            stale += 1
+            continue
+        closed.add(current)
+
+        if current == destination:
+            # Jump points lie on straight or diagonal lines from each other; fill in the cells between them.
+            path = [current]
+            while came_from[path[-1]] is not None:
+                parent = came_from[path[-1]]
+                step = (((parent % width > path[-1] % width) - (parent % width < path[-1] % width))
+                        + ((parent // width > path[-1] // width) - (parent // width < path[-1] // width)) * width)
+                while path[-1] != parent:
+                    path.append(path[-1] + step)
+            path.reverse()
+            print('total cost: {} '.format(cost_so_far[current]))
+            break
+
+        expanded += 1
+        x, y = current % width, current // width
+        parent = came_from[current]
+        if parent is None or not is_uniform(x, y):
+            directions = [(dx, dy) for dx, dy, _ in NEIGHBOR_STEPS]
         else:
-            graph_cost[cell] = 'inf'
+            dx = (x > parent % width) - (x < parent % width)
+            dy = (y > parent // width) - (y < parent // width)
+            directions = [(dx, dy)] + forced(x, y, dx, dy)
+            if dx and dy:
+                directions += [(dx, 0), (0, dy)]
+
+        for dx, dy in directions:
+            found = jump(x, y, dx, dy)
+            if found is None:
+                continue
+            next_cell, jump_cost = found
+            new_cost = cost_so_far[current] + jump_cost
+            if next_cell not in closed and (next_cell not in cost_so_far or new_cost < cost_so_far[next_cell]):
+                cost_so_far[next_cell] = new_cost
+                came_from[next_cell] = current
+                heappush(frontier, (new_cost + octile_heuristic(graph, next_cell, destination), next_cell))
+                pushed += 1
+
+    if stats is not None:
+        stats.update(expanded=expanded, scanned=scanned, pushed=pushed, stale=stale)
+    return path
+
+
+def dijkstras_shortest_path_to_all(initial_position, graph, adj, came_from=None, stats=None, frontier='heap'):
+    """ Calculates the minimum cost to every reachable cell in a graph from the initial_position.
+
+    Args:
+        initial_position: The initial cell from which the path extends.
+        graph: A loaded level, containing walls, spaces, and waypoints.
+        adj: An adjacency function returning cells adjacent to a given cell as well as their respective edge costs.
+        came_from: If given, a dictionary filled with each reached cell's predecessor on its cheapest path
+            (None for the initial_position).
+        stats: If given, a dictionary filled with the search's 'expanded', 'pushed' and 'stale' counts.
+        frontier: The name of the priority queue to use, one of FRONTIERS.
+
+    Returns:
+        A dictionary, mapping destination cells to the cost of a path from the initial_position.
+    """
+    queue = FRONTIERS[frontier](graph)
+    push, pop = queue.push, queue.pop
+    push(0, initial_position)
+    cost_so_far = {}
+    cost_so_far[initial_position] = 0
+    if came_from is not None:
+        came_from[initial_position] = None
+
+    expanded, pushed, stale = 0, 1, 0
+
+    while queue:
+        current_cost, current = pop()
+
+        # A cheaper entry for this cell was pushed after this one and has already been expanded.
+        if current_cost > cost_so_far[current]:
+            stale += 1
+            continue
+
+        expanded += 1
+        for next_cell, edge_cost in adj(graph, current):
+            new_cost = current_cost + edge_cost
+            if next_cell not in cost_so_far or new_cost < cost_so_far[next_cell]:
+                cost_so_far[next_cell] = new_cost
+                push(new_cost, next_cell)
+                pushed += 1
+                if came_from is not None:
+                    came_from[next_cell] = current
+
+    if stats is not None:
+        stats.update(expanded=expanded, pushed=pushed, stale=stale)
+    return cost_so_far
 
 
 def navigation_edges(level, cell):
@@ -111,57 +449,94 @@ def navigation_edges(level, cell):
              ((1,1), 1.4142135623730951),
              ... ]
     """
-    dirs = [[1, 0],  # basic ones
-            [0, 1],
-            [-1, 0],
-            [0, -1]]
-    diag = [[-1, -1],
-            [1, -1],
-            [-1, 1],
-            [1, 1]]
-    ogCellCost = 0
-    neighborCost = 0
-
-    if cell in level['spaces'].keys():
-        ogCellCost = level['spaces'].get(cell)
-    if cell in level['waypoints'].values():
-        ogCellCost = 1
-    if cell in level['walls']:
-        ogCellCost = None
+    index = cell_index(level, cell)
+    if index is None:
+        return []
+    return [(index_cell(level, neighbor), cost) for neighbor, cost in grid_navigation_edges(level, index)]
+
+
+def grid_navigation_edges(level, index):
+    """ Same as navigation_edges, but for cells given as flat indices into the level's cost array.
+
+    Args:
+        level: A loaded level, containing its width, height and flat cell costs.
+        index: The flat index of a target location.
+
+    Returns:
+        A list of tuples containing an adjacent cell's flat index and the cost of the edge joining it and the
+        originating cell.
+    """
+    width, height, costs = level['width'], level['height'], level['costs']
+    cell_cost = costs[index]
+    if cell_cost <= 0.:
+        return []
 
+    x, y = index % width, index // width
     result = []
-    for dir in dirs:
-        neighbor = (cell[0] + dir[0], cell[1] + dir[1])
-        if neighbor in level['spaces']:
-            neighborCost = level['spaces'].get(neighbor)
-        if neighbor in level['waypoints'].values():
-            neighborCost = 1
-        if neighbor in level['walls']:
-            neighborCost = None
-        if neighborCost and ogCellCost is not None:
-            neighborEdgeCost = (neighbor, 0.5 * (ogCellCost + neighborCost))
-            result.append(neighborEdgeCost)
-    for dir in diag:
-        neighbor = (cell[0] + dir[0], cell[1] + dir[1])
-        if neighbor in level['spaces']:
-            neighborCost = level['spaces'].get(neighbor)
-        if neighbor in level['waypoints'].values():
-            neighborCost = 1
-        if neighbor in level['walls']:
-            neighborCost = None
-        if neighborCost and ogCellCost is not None:
-            neighborEdgeCost = (neighbor, 0.5 * sqrt(2) * (ogCellCost + neighborCost))
-            result.append(neighborEdgeCost)
+    for dx, dy, factor in NEIGHBOR_STEPS:
+        if 0 <= x + dx < width and 0 <= y + dy < height:
+            neighbor = index + dy * width + dx
+            neighbor_cost = costs[neighbor]
+            if neighbor_cost > 0.:
+                result.append((neighbor, factor * (cell_cost + neighbor_cost)))
     return result
 
 
-def test_route(filename, src_waypoint, dst_waypoint):
+def compiled_navigation_edges(level, index):
+    """ Same as grid_navigation_edges, but looked up in the adjacency compiled when the level was loaded.
+
+    Args:
+        level: A loaded level, containing its compiled adjacency.
+        index: The flat index of a target location.
+
+    Returns:
+        An iterable of (neighbor index, edge cost) tuples.
+    """
+    adjacency = level['adjacency']
+    start, end = adjacency['offsets'][index], adjacency['offsets'][index + 1]
+    return zip(adjacency['neighbors'][start:end], adjacency['edge_costs'][start:end])
+
+
+def distance_field_path(level, field, destination):
+    """ Recovers a cheapest path from a distance field by stepping back to the neighbor that explains each cost.
+
+    Args:
+        level: A loaded level, containing its compiled adjacency.
+        field: A flat sequence of per-cell costs from the path's origin, as kept by the distance cache.
+        destination: The flat index of the end of the path.
+
+    Returns:
+        The list of flat cell indices from the field's origin to destination, or None if it is unreachable.
+    """
+    if field[destination] == inf:
+        return None
+
+    path = [destination]
+    while field[path[-1]] > 0:
+        edges = compiled_navigation_edges(level, path[-1])
+        path.append(min(edges, key=lambda edge: field[edge[0]] + edge[1])[0])
+    path.reverse()
+    return path
+
+
+# Point-to-point searches selectable by test_route, all taking (initial_position, destination, graph, adj) and an
+# optional stats dictionary.
+ROUTE_ALGORITHMS = {'dijkstra': dijkstras_shortest_path,
+                    'astar': a_star_shortest_path,
+                    'bidirectional': bidirectional_shortest_path,
+                    'jps': jump_point_search}
+
+
+def test_route(filename, src_waypoint, dst_waypoint, algorithm='dijkstra', use_cache=False):
     """ Loads a level, searches for a path between the given waypoints, and displays the result.
 
     Args:
         filename: The name of the text file containing the level.
         src_waypoint: The character associated with the initial waypoint.
         dst_waypoint: The character associated with the destination waypoint.
+        algorithm: The name of the search to use, one of ROUTE_ALGORITHMS.
+        use_cache: Whether to read the path off src_waypoint's cached distance field instead of searching with
+            algorithm, when cost_to_all_cells has stored one.
 
     """
 
@@ -170,18 +545,27 @@ def test_route(filename, src_waypoint, dst_waypoint):
     show_level(level)
 
     # Retrieve the source and destination coordinates from the level.
-    src = level['waypoints'][src_waypoint]
-    dst = level['waypoints'][dst_waypoint]
+    src = cell_index(level, level['waypoints'][src_waypoint])
+    dst = cell_index(level, level['waypoints'][dst_waypoint])
 
     # Search for and display the path from src to dst.
-    path = dijkstras_shortest_path(src, dst, level, navigation_edges)
+    field = load_distance_field(distance_cache_key(filename, src_waypoint)) if use_cache else None
+    if field is not None:
+        print("Using the cached distance field of waypoint {} instead of searching.".format(src_waypoint))
+        path = distance_field_path(level, field, dst)
+        if path:
+            print('total cost: {} '.format(field[dst]))
+    else:
+        stats = {}
+        path = ROUTE_ALGORITHMS[algorithm](src, dst, level, compiled_navigation_edges, stats=stats)
+        print('search stats: ' + ', '.join('{} {}'.format(key, value) for key, value in sorted(stats.items())))
     if path:
         show_level(level, path)
     else:
         print("No path possible!")
 
 
-def cost_to_all_cells(filename, src_waypoint, output_filename):
+def cost_to_all_cells(filename, src_waypoint, output_filename, use_cache=True):
     """ Loads a level, calculates the cost to all reachable cells from 
     src_waypoint, then saves the result in a csv file with name output_filename.
 
@@ -189,6 +573,7 @@ def cost_to_all_cells(filename, src_waypoint, output_filename):
         filename: The name of the text file containing the level.
         src_waypoint: The character associated with the initial waypoint.
         output_filename: The filename for the output csv file.
+        use_cache: Whether to reuse, or else store, the distance field in the on-disk cache.
 
     """
 
@@ -197,18 +582,31 @@ def cost_to_all_cells(filename, src_waypoint, output_filename):
     show_level(level)
 
     # Retrieve the source coordinates from the level.
-    src = level['waypoints'][src_waypoint]
+    src = cell_index(level, level['waypoints'][src_waypoint])
 
     # Calculate the cost to all reachable cells from src and save to a csv file.
-    costs_to_all_cells = dijkstras_shortest_path_to_all(src, level, navigation_edges(level, src))
-    save_level_costs(level, costs_to_all_cells, output_filename)
+    key = distance_cache_key(filename, src_waypoint)
+    costs_to_all_cells = load_distance_field(key) if use_cache else None
+    if costs_to_all_cells is None:
+        costs_to_all_cells = dijkstras_shortest_path_to_all(src, level, compiled_navigation_edges)
+        if use_cache:
+            store_distance_field(level, key, costs_to_all_cells)
+    # The search gives the origin the int cost 0 and the cache the float 0.0; both are written as 0.
+    save_level_costs(level, costs_to_all_cells, output_filename, origin=src)
 
 
 if __name__ == '__main__':
-    filename, src_waypoint, dst_waypoint = 'example.txt', 'a', 'e'
+    filename, src_waypoint, dst_waypoint, algorithm = 'example.txt', 'a', 'e', 'dijkstra'
+
+    if len(sys.argv) in (4, 5):
+        filename, src_waypoint, dst_waypoint = sys.argv[1:4]
+        algorithm = sys.argv[4] if len(sys.argv) == 5 else algorithm
+    if len(sys.argv) not in (1, 4, 5) or algorithm not in ROUTE_ALGORITHMS:
+        print("usage: %s level_filename src_waypoint dst_waypoint [%s]" % (sys.argv[0], '|'.join(ROUTE_ALGORITHMS)))
+        sys.exit(-1)
 
     # Use this function call to find the route between two waypoints.
-    test_route(filename, src_waypoint, dst_waypoint)
+    test_route(filename, src_waypoint, dst_waypoint, algorithm)
 
     # Use this function to calculate the cost to all reachable cells from an origin point.
     cost_to_all_cells(filename, src_waypoint, 'my_costs.csv')
\ No newline at end of file
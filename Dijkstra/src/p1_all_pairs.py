@@ -0,0 +1,163 @@
+import atexit
+import sys
+from array import array
+from csv import writer
+from math import inf
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+from p1 import dijkstras_shortest_path_to_all, compiled_navigation_edges
+from p1_support import load_level, cell_index
+
+# The parts of a level the workers search over, with the array type code of each.
+SHARED_ARRAYS = (('offsets', 'i'), ('neighbors', 'i'), ('edge_costs', 'd'))
+
+# Set in each worker process by attach_level.
+worker_level = None
+worker_blocks = []
+
+
+def share_level(level):
+    """ Copies a level's compiled adjacency into shared memory blocks.
+
+    Args:
+        level: A loaded level, containing its compiled adjacency.
+
+    Returns:
+        The list of SharedMemory blocks, and a picklable spec workers can attach to them with.
+    """
+    blocks = []
+    spec = {'width': level['width'], 'height': level['height'], 'waypoints': level['waypoints'], 'arrays': []}
+
+    for name, typecode in SHARED_ARRAYS:
+        data = level['adjacency'][name]
+        block = SharedMemory(create=True, size=max(1, len(data) * data.itemsize))
+        block.buf[:len(data) * data.itemsize] = data.tobytes()
+        blocks.append(block)
+        spec['arrays'].append((name, typecode, block.name, len(data)))
+
+    return blocks, spec
+
+
+def attach_level(spec):
+    """ Pool initializer rebuilding a searchable level from the shared memory blocks described by spec. """
+    global worker_level
+
+    atexit.register(detach_level)
+    adjacency = {}
+    for name, typecode, block_name, length in spec['arrays']:
+        block = SharedMemory(name=block_name)
+        worker_blocks.append(block)
+        adjacency[name] = block.buf.cast(typecode)[:length]
+
+    worker_level = {'width': spec['width'],
+                    'height': spec['height'],
+                    'waypoints': spec['waypoints'],
+                    'adjacency': adjacency}
+
+
+def detach_level():
+    """ Releases the worker's views of the shared memory blocks and closes them, so the worker exits cleanly. """
+    global worker_level
+
+    if worker_level is not None:
+        for view in worker_level['adjacency'].values():
+            view.release()
+        worker_level = None
+
+    for block in worker_blocks:
+        block.close()
+    worker_blocks.clear()
+
+
+def waypoint_row(task):
+    """ Searches from one waypoint and returns its costs to every waypoint, plus its predecessor tree if asked. """
+    src_waypoint, waypoints, keep_tree = task
+    level = worker_level
+
+    src = cell_index(level, level['waypoints'][src_waypoint])
+    came_from = {} if keep_tree else None
+    costs = dijkstras_shortest_path_to_all(src, level, compiled_navigation_edges, came_from)
+
+    row = [costs.get(cell_index(level, level['waypoints'][waypoint]), inf) for waypoint in waypoints]
+
+    tree = None
+    if keep_tree:
+        tree = array('i', [-1]) * (level['width'] * level['height'])
+        for cell, parent in came_from.items():
+            tree[cell] = cell if parent is None else parent
+    return row, tree
+
+
+def all_pairs_waypoint_costs(level, processes=None, predecessors=False):
+    """ Calculates the minimum cost between every pair of waypoints in a level, one search per waypoint spread
+    over a process pool.
+
+    Args:
+        level: A loaded level.
+        processes: The number of worker processes, as many as there are CPUs by default.
+        predecessors: Whether to also return each waypoint's predecessor tree.
+
+    Returns:
+        The sorted list of waypoint characters, the matrix (list of rows) of costs between them, and a dict
+        mapping each waypoint to its predecessor tree (an array giving every cell's parent index, the waypoint
+        itself for its own cell and -1 for unreached cells), or None when predecessors is False.
+    """
+    waypoints = sorted(level['waypoints'])
+    blocks, spec = share_level(level)
+
+    try:
+        with Pool(processes, initializer=attach_level, initargs=(spec,)) as pool:
+            results = pool.map(waypoint_row, [(waypoint, waypoints, predecessors) for waypoint in waypoints])
+            # Let the workers exit on their own, running detach_level, rather than being terminated.
+            pool.close()
+            pool.join()
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    matrix = [row for row, _ in results]
+    trees = {waypoint: tree for waypoint, (_, tree) in zip(waypoints, results)} if predecessors else None
+    return waypoints, matrix, trees
+
+
+def tree_path(tree, destination):
+    """ Reconstructs the path ending at destination from a predecessor tree.
+
+    Args:
+        tree: A predecessor tree as returned by all_pairs_waypoint_costs.
+        destination: The flat index of the end of the path.
+
+    Returns:
+        The list of flat cell indices from the tree's root to destination, or None if destination is unreached.
+    """
+    if tree[destination] == -1:
+        return None
+    path = [destination]
+    while tree[path[-1]] != path[-1]:
+        path.append(tree[path[-1]])
+    path.reverse()
+    return path
+
+
+def save_waypoint_matrix(waypoints, matrix, filename='waypoint_costs.csv'):
+    """ Saves a waypoint cost matrix as a csv file, headed by the waypoint characters. """
+    assert '.csv' in filename, 'Error: filename does not contain file type.'
+    with open(filename, 'w', newline='') as f:
+        csv_writer = writer(f)
+        csv_writer.writerow([''] + waypoints)
+        for waypoint, row in zip(waypoints, matrix):
+            csv_writer.writerow([waypoint] + row)
+
+    print("Saved file:", filename)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (3, 4):
+        print("usage: %s level_filename output_filename [processes]" % sys.argv[0])
+        sys.exit(-1)
+
+    processes = int(sys.argv[3]) if len(sys.argv) == 4 else None
+    waypoints, matrix, _ = all_pairs_waypoint_costs(load_level(sys.argv[1]), processes)
+    save_waypoint_matrix(waypoints, matrix, sys.argv[2])
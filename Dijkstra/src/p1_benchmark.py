@@ -0,0 +1,281 @@
+import os
+import random
+import sys
+import tracemalloc
+from contextlib import redirect_stdout
+from heapq import heappop, heappush
+from io import StringIO
+from itertools import permutations
+from math import inf
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from p1 import dijkstras_shortest_path, dijkstras_shortest_path_to_all, compiled_navigation_edges, FRONTIERS
+from p1 import ROUTE_ALGORITHMS
+from p1_hierarchy import build_hierarchy, hierarchical_shortest_path, CLUSTER_SIZE
+from p1_incremental import IncrementalPlanner
+from p1_maze import generate_maze
+from p1_support import load_level, cell_index, index_cell, update_cells, WALL
+
+INPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'input')
+LEVEL_FILENAME = os.path.join(INPUT_DIR, 'test_maze.txt')
+LEVEL_FILENAMES = (os.path.join(INPUT_DIR, 'example.txt'), LEVEL_FILENAME)
+# A generated maze with mixed cell costs, on which transitions placed without regard to cost give poor routes.
+WEIGHTED_MAZE = {'cells': 10 ** 4, 'wall_density': 0.1, 'costs': {'1': 1., '5': 1., '9': 1.}, 'waypoints': 'abcde'}
+
+
+def unpruned_shortest_path(initial_position, destination, graph, adj, stats):
+    """ dijkstras_shortest_path as it was before stale frontier entries were skipped, for comparison. """
+    frontier = [(0, initial_position)]
+    came_from = {initial_position: None}
+    cost_so_far = {initial_position: 0}
+    expanded = 0
+
+    while frontier:
+        current = heappop(frontier)[1]
+        if current == destination:
+            break
+        expanded += 1
+        for next_cell, edge_cost in adj(graph, current):
+            new_cost = cost_so_far[current] + edge_cost
+            if next_cell not in cost_so_far or new_cost < cost_so_far[next_cell]:
+                cost_so_far[next_cell] = new_cost
+                came_from[next_cell] = current
+                heappush(frontier, (new_cost, next_cell))
+
+    stats['expanded'] = expanded
+    return cost_so_far.get(destination)
+
+
+def unpruned_shortest_path_to_all(initial_position, graph, adj, stats):
+    """ dijkstras_shortest_path_to_all as it was before stale frontier entries were skipped, for comparison. """
+    frontier = [(0, initial_position)]
+    cost_so_far = {initial_position: 0}
+    expanded = 0
+
+    while frontier:
+        current = heappop(frontier)[1]
+        expanded += 1
+        for next_cell, edge_cost in adj(graph, current):
+            new_cost = cost_so_far[current] + edge_cost
+            if next_cell not in cost_so_far or new_cost < cost_so_far[next_cell]:
+                cost_so_far[next_cell] = new_cost
+                heappush(frontier, (new_cost, next_cell))
+
+    stats['expanded'] = expanded
+    return cost_so_far
+
+
+def timed(search, *args):
+    """ Runs a search, returning its expansion count and wall time in seconds. """
+    stats = {}
+    start = perf_counter()
+    with redirect_stdout(StringIO()):
+        search(*args, stats=stats)
+    return stats['expanded'], perf_counter() - start
+
+
+def benchmark_frontier(filename=LEVEL_FILENAME):
+    """ Prints expansions and wall time of both Dijkstra entry points before and after stale-entry skipping.
+
+    Args:
+        filename: The name of the text file containing the level to search.
+
+    """
+    level = load_level(filename)
+    waypoints = {char: cell_index(level, cell) for char, cell in sorted(level['waypoints'].items())}
+    adj = compiled_navigation_edges
+
+    print('%-10s %-8s %12s %12s %10s %10s' % ('search', 'route', 'exp before', 'exp after', 's before', 's after'))
+    totals = [0, 0, 0., 0.]
+
+    def report(search_name, route, before, after):
+        row = [before[0], after[0], before[1], after[1]]
+        print('%-10s %-8s %12d %12d %10.3f %10.3f' % (search_name, route, *row))
+        for i, value in enumerate(row):
+            totals[i] += value
+
+    for src, dst in permutations(waypoints, 2):
+        before = timed(unpruned_shortest_path, waypoints[src], waypoints[dst], level, adj)
+        after = timed(dijkstras_shortest_path, waypoints[src], waypoints[dst], level, adj)
+        report('path', src + '->' + dst, before, after)
+
+    for src in waypoints:
+        before = timed(unpruned_shortest_path_to_all, waypoints[src], level, adj)
+        after = timed(dijkstras_shortest_path_to_all, waypoints[src], level, adj)
+        report('to_all', src + '->*', before, after)
+
+    print('%-10s %-8s %12d %12d %10.3f %10.3f' % ('total', '', *totals))
+
+
+def compare_frontiers(filenames=LEVEL_FILENAMES):
+    """ Checks that the heap and bucket frontiers give identical costs from every waypoint, and prints their times.
+
+    Args:
+        filenames: The names of the text files containing the levels to search.
+
+    """
+    print('%-16s %-6s %10s %10s' % ('level', 'source', 's heap', 's bucket'))
+
+    for filename in filenames:
+        level = load_level(filename)
+        for char, cell in sorted(level['waypoints'].items()):
+            results = {}
+            for frontier in FRONTIERS:
+                start = perf_counter()
+                costs = dijkstras_shortest_path_to_all(cell_index(level, cell), level, compiled_navigation_edges,
+                                                       frontier=frontier)
+                results[frontier] = costs, perf_counter() - start
+
+            assert results['heap'][0] == results['bucket'][0], 'frontiers disagree from ' + char
+            print('%-16s %-6s %10.3f %10.3f' % (os.path.basename(filename), char,
+                                                results['heap'][1], results['bucket'][1]))
+
+
+def compare_route_algorithms(filename=LEVEL_FILENAME):
+    """ Prints the cells each route algorithm expands between every pair of waypoints, per direction where a search
+    has more than one.
+
+    Args:
+        filename: The name of the text file containing the level to search.
+
+    """
+    level = load_level(filename)
+    waypoints = {char: cell_index(level, cell) for char, cell in sorted(level['waypoints'].items())}
+
+    print('%-8s %-14s %10s %10s %10s %10s' % ('route', 'algorithm', 'expanded', 'forward', 'backward', 'seconds'))
+    for src, dst in permutations(waypoints, 2):
+        for name, search in ROUTE_ALGORITHMS.items():
+            stats = {}
+            start = perf_counter()
+            with redirect_stdout(StringIO()):
+                search(waypoints[src], waypoints[dst], level, compiled_navigation_edges, stats=stats)
+            print('%-8s %-14s %10d %10s %10s %10.3f' % (src + '->' + dst, name, stats['expanded'],
+                                                        stats.get('expanded_forward', '-'),
+                                                        stats.get('expanded_backward', '-'),
+                                                        perf_counter() - start))
+
+
+def benchmark_edit_stream(filename=LEVEL_FILENAME, batches=20, batch_size=10, seed=0):
+    """ Applies batches of random cell edits to a level and prints the cost of repairing the route between its first
+    and last waypoints incrementally, against rerunning dijkstras_shortest_path after every batch.
+
+    Args:
+        filename: The name of the text file containing the level to edit.
+        batches: The number of edit batches to apply.
+        batch_size: The number of cells changed by each batch.
+        seed: The seed for the random edits, so runs can be repeated.
+
+    """
+    rng = random.Random(seed)
+    level = load_level(filename)
+    waypoints = sorted(level['waypoints'])
+    src = cell_index(level, level['waypoints'][waypoints[0]])
+    dst = cell_index(level, level['waypoints'][waypoints[-1]])
+
+    # Edits land on open cells other than the waypoints, turning them into walls or giving them a new cost.
+    cells = [index for index, cost in enumerate(level['costs']) if cost > 0. and index not in (src, dst)]
+    tiles = WALL + '123456789'
+
+    planner = IncrementalPlanner(level, src, dst)
+    start = perf_counter()
+    expanded = planner.compute()
+    print('initial search: expanded %d in %.3f s' % (expanded, perf_counter() - start))
+
+    print('%-6s %8s %10s %10s %10s %10s %10s' % ('batch', 'changed', 'patch s', 'exp repair', 's repair',
+                                                 'exp full', 's full'))
+    totals = [0, 0., 0, 0., 0, 0.]
+    for batch in range(batches):
+        updates = [(index_cell(level, rng.choice(cells)), rng.choice(tiles)) for _ in range(batch_size)]
+
+        start = perf_counter()
+        changed = update_cells(level, updates)
+        patched = perf_counter() - start
+        start = perf_counter()
+        repair = planner.repair(changed), perf_counter() - start
+        full = timed(dijkstras_shortest_path, src, dst, level, compiled_navigation_edges)
+
+        path = planner.path()
+        reference = dijkstras_shortest_path_to_all(src, level, compiled_navigation_edges).get(dst, inf)
+        assert planner.cost() == reference or abs(planner.cost() - reference) <= 1e-9 * max(1., reference), \
+            'repair disagrees in batch %d' % batch
+        assert (path is None) == (reference == inf)
+
+        row = [len(changed), patched, repair[0], repair[1], full[0], full[1]]
+        print('%-6d %8d %10.4f %10d %10.4f %10d %10.4f' % (batch, *row))
+        for i, value in enumerate(row):
+            totals[i] += value
+
+    print('%-6s %8d %10.4f %10d %10.4f %10d %10.4f' % ('total', *totals))
+
+
+def route_cost(level, path):
+    """ Sums the edge costs along a path of flat cell indices. """
+    return sum(dict(compiled_navigation_edges(level, a))[b] for a, b in zip(path, path[1:]))
+
+
+def compare_hierarchy(filename=LEVEL_FILENAME, cluster_size=CLUSTER_SIZE, weighted=True):
+    """ Prints the preprocessing cost and memory of a level's cluster hierarchy, then the latency, peak memory and
+    path cost of hierarchical queries against flat Dijkstra between every pair of waypoints.
+
+    Args:
+        filename: The name of the text file containing the level to search.
+        cluster_size: The side length of the clusters, in cells.
+        weighted: Whether to compare on a generated WEIGHTED_MAZE too, after the level.
+
+    """
+    if weighted:
+        compare_hierarchy(filename, cluster_size, weighted=False)
+        with TemporaryDirectory() as directory:
+            maze_filename = os.path.join(directory, 'weighted_maze.txt')
+            generate_maze(maze_filename, **WEIGHTED_MAZE)
+            print('weighted maze:')
+            compare_hierarchy(maze_filename, cluster_size, weighted=False)
+        return
+
+    level = load_level(filename)
+    waypoints = {char: cell_index(level, cell) for char, cell in sorted(level['waypoints'].items())}
+    adjacency_bytes = sum(len(data) * data.itemsize for data in level['adjacency'].values())
+
+    start = perf_counter()
+    hierarchy = build_hierarchy(level, cluster_size)
+    built = perf_counter() - start
+    # Measured in a second build, as tracing allocations slows building down.
+    tracemalloc.start()
+    traced = build_hierarchy(level, cluster_size)
+    hierarchy_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del traced
+
+    print('clusters %d, entrances %d, abstract edges %d, built in %.3f s' % (
+        hierarchy['clusters_x'] * hierarchy['clusters_y'], len(hierarchy['edges']),
+        sum(len(edges) for edges in hierarchy['edges'].values()), built))
+    print('memory: compiled adjacency %d KiB, hierarchy %d KiB' % (adjacency_bytes // 1024, hierarchy_bytes // 1024))
+
+    print('%-8s %10s %10s %10s %10s %10s' % ('route', 's flat', 's hpa', 'KiB flat', 'KiB hpa', 'cost ratio'))
+    searches = {'flat': lambda src, dst: dijkstras_shortest_path(src, dst, level, compiled_navigation_edges),
+                'hpa': lambda src, dst: hierarchical_shortest_path(src, dst, level, hierarchy)}
+    for src, dst in permutations(waypoints, 2):
+        row = {}
+        for name, search in searches.items():
+            with redirect_stdout(StringIO()):
+                start = perf_counter()
+                path = search(waypoints[src], waypoints[dst])
+                seconds = perf_counter() - start
+                tracemalloc.start()
+                search(waypoints[src], waypoints[dst])
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            row[name] = seconds, peak, route_cost(level, path) if path else inf
+
+        ratio = row['hpa'][2] / row['flat'][2] if row['flat'][2] not in (0, row['hpa'][2]) else 1.
+        print('%-8s %10.4f %10.4f %10d %10d %10.4f' % (src + '->' + dst, row['flat'][0], row['hpa'][0],
+                                                     row['flat'][1] // 1024, row['hpa'][1] // 1024, ratio))
+
+
+if __name__ == '__main__':
+    benchmark_frontier(*sys.argv[1:2])
+    compare_frontiers(sys.argv[1:2] or LEVEL_FILENAMES)
+    compare_route_algorithms(*sys.argv[1:2])
+    benchmark_edit_stream(*sys.argv[1:2])
+    compare_hierarchy(*sys.argv[1:2])
@@ -0,0 +1,113 @@
+import sys
+from csv import writer
+
+import numpy
+
+from p1_support import load_level, save_level_costs, cell_index
+
+
+def distance_fields(level, sources):
+    """ Calculates the minimum cost from each source to every cell of a level at once, as NumPy arrays.
+
+    This is Dijkstra's algorithm with a sliding bucket as wide as the cheapest edge: every pending cell closer than
+    the nearest pending cell plus that edge cost can no longer improve, so the whole bucket is settled and relaxed in
+    one vectorized step. The edges come from the level's compiled adjacency, so costs agree exactly with
+    navigation_edges.
+
+    Args:
+        level: A loaded level, containing its compiled adjacency.
+        sources: The flat indices of the cells to measure from.
+
+    Returns:
+        A float array of shape (len(sources), height, width), holding inf wherever a cell cannot be reached.
+    """
+    width, height = level['width'], level['height']
+    cells = width * height
+    adjacency = level['adjacency']
+    offsets = numpy.frombuffer(adjacency['offsets'], dtype=numpy.int32)
+    neighbors = numpy.frombuffer(adjacency['neighbors'], dtype=numpy.int32)
+    edge_costs = numpy.frombuffer(adjacency['edge_costs'], dtype=numpy.float64)
+    degrees = numpy.diff(offsets)
+    bucket_width = edge_costs.min() if len(edge_costs) else 1.
+
+    # One row of distances per source, flattened so a single index addresses (source, cell).
+    dist = numpy.full(len(sources) * cells, numpy.inf)
+    pending = numpy.arange(len(sources)) * cells + numpy.asarray(sources, dtype=numpy.int64)
+    dist[pending] = 0.
+
+    while pending.size:
+        pending_dist = dist[pending]
+        settled = pending_dist < pending_dist.min() + bucket_width
+        frontier = pending[settled]
+        pending = pending[~settled]
+
+        rows, frontier_cells = numpy.divmod(frontier, cells)
+        counts = degrees[frontier_cells]
+        edges = (numpy.arange(counts.sum())
+                 + numpy.repeat(offsets[frontier_cells] - (numpy.cumsum(counts) - counts), counts))
+
+        targets = numpy.repeat(rows * cells, counts) + neighbors[edges]
+        new_dist = numpy.repeat(dist[frontier], counts) + edge_costs[edges]
+
+        improved = new_dist < dist[targets]
+        targets, new_dist = targets[improved], new_dist[improved]
+        numpy.minimum.at(dist, targets, new_dist)
+        pending = numpy.union1d(pending, targets)
+
+    return dist.reshape(len(sources), height, width)
+
+
+def distance_field(level, source):
+    """ Calculates the minimum cost from one source to every cell of a level, as a (height, width) array. """
+    return distance_fields(level, [source])[0]
+
+
+def save_distance_field(level, field, filename='distance_map.csv'):
+    """ Saves a distance field in the same layout as save_level_costs, which also writes its binary formats.
+
+    Args:
+        level: The level the field was calculated over.
+        field: A (height, width) array of costs from an origin point.
+        filename: The name of the file to be created, in one of DISTANCE_MAP_FORMATS.
+
+    """
+    if not filename.endswith('.csv'):
+        save_level_costs(level, field.ravel(), filename)
+        return
+
+    x_lo, x_hi, y_lo, y_hi = level['bounds']
+
+    assert '.csv' in filename, 'Error: filename does not contain file type.'
+    with open(filename, 'w', newline='') as f:
+        writer(f).writerows(field[y_lo:y_hi + 1, x_lo:x_hi + 1].tolist())
+
+    print("Saved file:", filename)
+
+
+def waypoint_cost_maps(filename, src_waypoints=None, output_template='{}_costs.csv'):
+    """ Loads a level, calculates the cost to all cells from each of the given waypoints in one batch, then saves
+    each result in a csv file.
+
+    Args:
+        filename: The name of the text file containing the level.
+        src_waypoints: The characters of the waypoints to measure from, all of the level's waypoints by default.
+        output_template: The output filename, with {} standing for the waypoint character.
+
+    """
+    level = load_level(filename)
+    if src_waypoints is None:
+        src_waypoints = sorted(level['waypoints'])
+
+    sources = [cell_index(level, level['waypoints'][waypoint]) for waypoint in src_waypoints]
+    fields = distance_fields(level, sources)
+
+    for waypoint, field in zip(src_waypoints, fields):
+        save_distance_field(level, field, output_template.format(waypoint))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("usage: %s level_filename [src_waypoint ...]" % sys.argv[0])
+        sys.exit(-1)
+
+    waypoint_cost_maps(sys.argv[1], sys.argv[2:] or None)
@@ -0,0 +1,297 @@
+import sys
+from heapq import heappop, heappush
+from math import inf
+
+from p1 import compiled_navigation_edges
+from p1_support import load_level, show_level, cell_index
+
+# Side length, in cells, of the square clusters a level is partitioned into.
+CLUSTER_SIZE = 16
+
+
+def cluster_of(hierarchy, index):
+    """ Returns the number of the cluster containing the cell with the given flat index. """
+    width, size = hierarchy['width'], hierarchy['cluster_size']
+    return (index // width) // size * hierarchy['clusters_x'] + (index % width) // size
+
+
+def cluster_bounds(hierarchy, cluster):
+    """ Returns the inclusive (x_lo, x_hi, y_lo, y_hi) cell bounds of a cluster. """
+    size = hierarchy['cluster_size']
+    x_lo, y_lo = cluster % hierarchy['clusters_x'] * size, cluster // hierarchy['clusters_x'] * size
+    return x_lo, min(x_lo + size, hierarchy['width']) - 1, y_lo, min(y_lo + size, hierarchy['height']) - 1
+
+
+def cluster_search(level, bounds, source, targets=()):
+    """ Runs Dijkstra's algorithm from source without leaving the given bounds.
+
+    Args:
+        level: A loaded level, containing its compiled adjacency.
+        bounds: The inclusive (x_lo, x_hi, y_lo, y_hi) bounds of the cells the search may use.
+        source: The flat index of the cell to search from.
+        targets: If given, the search stops as soon as all of these cells have been settled.
+
+    Returns:
+        The dict of costs from source and the dict of predecessors, as built by dijkstras_shortest_path. Costs are
+        final for every target reached, or for every cell if the search ran to the end.
+    """
+    x_lo, x_hi, y_lo, y_hi = bounds
+    width = level['width']
+    remaining = set(targets)
+    remaining.discard(source)
+
+    frontier = [(0, source)]
+    cost_so_far = {source: 0}
+    came_from = {source: None}
+
+    while frontier and (remaining or not targets):
+        current_cost, current = heappop(frontier)
+        if current_cost > cost_so_far[current]:
+            continue
+        remaining.discard(current)
+        for next_cell, edge_cost in compiled_navigation_edges(level, current):
+            if x_lo <= next_cell % width <= x_hi and y_lo <= next_cell // width <= y_hi:
+                new_cost = current_cost + edge_cost
+                if next_cell not in cost_so_far or new_cost < cost_so_far[next_cell]:
+                    cost_so_far[next_cell] = new_cost
+                    came_from[next_cell] = current
+                    heappush(frontier, (new_cost, next_cell))
+
+    return cost_so_far, came_from
+
+
+def find_transitions(level, hierarchy):
+    """ Picks the pairs of cells through which paths cross from one cluster into another.
+
+    Along each border between two clusters, every run of cells that are open on both sides and cost the same to cross
+    becomes one transition in its middle, or two at its ends if it is 6 cells or longer. Runs end wherever the cost
+    of either side changes, as a transition placed by position alone would send weighted routes the long way round. An open cell whose counterpart across the border
+    is blocked can still step diagonally into another cluster, so each of those steps becomes a transition too.
+
+    Args:
+        level: A loaded level, containing its compiled adjacency.
+        hierarchy: The hierarchy being built, giving the cluster layout.
+
+    Returns:
+        A list of (cell, cell, edge cost) transitions between flat indices in different clusters.
+    """
+    width, height, costs = level['width'], level['height'], level['costs']
+    size = hierarchy['cluster_size']
+    transitions = []
+
+    # Each border is a list of straight (inside, outside) pairs of cells facing each other across it.
+    borders = []
+    for border_x in range(size, width, size):
+        for y_lo in range(0, height, size):
+            borders.append([(y * width + border_x - 1, y * width + border_x)
+                            for y in range(y_lo, min(y_lo + size, height))])
+    for border_y in range(size, height, size):
+        for x_lo in range(0, width, size):
+            borders.append([((border_y - 1) * width + x, border_y * width + x)
+                            for x in range(x_lo, min(x_lo + size, width))])
+
+    for border in borders:
+        run = []
+        for inside, outside in border + [(None, None)]:
+            crossing = inside is not None and costs[inside] > 0. and costs[outside] > 0.
+            if run and (not crossing or (costs[inside], costs[outside]) != (costs[run[0][0]], costs[run[0][1]])):
+                for inside_cell, outside_cell in ([run[len(run) // 2]] if len(run) < 6 else [run[0], run[-1]]):
+                    edge_cost = dict(compiled_navigation_edges(level, inside_cell))[outside_cell]
+                    transitions.append((inside_cell, outside_cell, edge_cost))
+                if crossing:
+                    # Where the cost changes, a diagonal step across the border can avoid the dearer cells.
+                    last_inside, last_outside = run[-1]
+                    for cell, neighbor in ((last_inside, outside), (inside, last_outside)):
+                        edge_cost = dict(compiled_navigation_edges(level, cell)).get(neighbor)
+                        if edge_cost is not None:
+                            transitions.append((cell, neighbor, edge_cost))
+                run = []
+
+            if crossing:
+                run.append((inside, outside))
+                continue
+
+            for cell in (inside, outside):
+                if cell is not None and costs[cell] > 0.:
+                    for neighbor, edge_cost in compiled_navigation_edges(level, cell):
+                        if cluster_of(hierarchy, neighbor) != cluster_of(hierarchy, cell):
+                            transitions.append((cell, neighbor, edge_cost))
+
+    return transitions
+
+
+def build_hierarchy(level, cluster_size=CLUSTER_SIZE):
+    """ Partitions a level into square clusters and builds the abstract graph between their entrances.
+
+    The abstract graph's nodes are the cells of every transition between clusters. Each transition is an edge, and
+    so is every pair of entrances of the same cluster, weighted by the cheapest path between them that stays
+    inside the cluster (found with the same edges as navigation_edges).
+
+    Args:
+        level: A loaded level, containing its compiled adjacency.
+        cluster_size: The side length of the clusters, in cells.
+
+    Returns:
+        The hierarchy (dict). 'entrances' maps each cluster number to the sorted list of its entrance cells, and
+        'edges' maps each entrance to a list of (entrance, cost) tuples, both as flat indices.
+
+    """
+    hierarchy = {'width': level['width'],
+                 'height': level['height'],
+                 'cluster_size': cluster_size,
+                 'clusters_x': -(-level['width'] // cluster_size),
+                 'clusters_y': -(-level['height'] // cluster_size)}
+
+    edges = {}
+    entrances = {}
+    for cell, neighbor, edge_cost in find_transitions(level, hierarchy):
+        for a, b in ((cell, neighbor), (neighbor, cell)):
+            if (b, edge_cost) not in edges.setdefault(a, []):
+                edges[a].append((b, edge_cost))
+            entrances.setdefault(cluster_of(hierarchy, a), set()).add(a)
+
+    for cluster in entrances:
+        entrances[cluster] = sorted(entrances[cluster])
+        bounds = cluster_bounds(hierarchy, cluster)
+        for i, entrance in enumerate(entrances[cluster]):
+            # Paths inside a cluster are symmetric, so each pair of entrances is searched only once.
+            others = entrances[cluster][i + 1:]
+            cost_so_far, _ = cluster_search(level, bounds, entrance, others)
+            for other in others:
+                if other in cost_so_far:
+                    edges[entrance].append((other, cost_so_far[other]))
+                    edges[other].append((entrance, cost_so_far[other]))
+
+    hierarchy['entrances'] = entrances
+    hierarchy['edges'] = edges
+    return hierarchy
+
+
+def tree_branch(came_from, cell):
+    """ Follows predecessors from cell back to the root of a search, returning the cells visited in that order. """
+    branch = [cell]
+    while came_from[branch[-1]] is not None:
+        branch.append(came_from[branch[-1]])
+    return branch
+
+
+def hierarchical_shortest_path(initial_position, destination, graph, hierarchy, stats=None):
+    """ Searches for a path through a level over its cluster hierarchy, then refines it into cells.
+
+    The start and goal are joined to the entrances of their own clusters by local searches, the abstract graph is
+    searched between them, and each abstract edge is refined by a search confined to its cluster. Paths are only
+    as good as the abstract graph allows, so a route can cost a few percent more than the optimal one, most of all
+    with small clusters over cells of varied cost.
+
+    Args:
+        initial_position: The flat index of the initial cell.
+        destination: The flat index of the destination cell.
+        graph: A loaded level, containing its compiled adjacency.
+        hierarchy: The level's hierarchy, as returned by build_hierarchy.
+        stats: If given, a dictionary filled with the abstract nodes 'expanded' and the 'local' searches run.
+
+    Returns:
+        If a path exits, return a list containing all cells from initial_position to destination.
+        Otherwise, return None.
+
+    """
+    entrances, edges = hierarchy['entrances'], hierarchy['edges']
+    src_cluster, dst_cluster = cluster_of(hierarchy, initial_position), cluster_of(hierarchy, destination)
+    src_entrances, dst_entrances = entrances.get(src_cluster, []), entrances.get(dst_cluster, [])
+
+    # Join the start and goal to their clusters' entrances, and to each other if they share a cluster.
+    direct = [destination] if src_cluster == dst_cluster else []
+    start_costs, start_tree = cluster_search(graph, cluster_bounds(hierarchy, src_cluster), initial_position,
+                                             src_entrances + direct)
+    goal_costs, goal_tree = cluster_search(graph, cluster_bounds(hierarchy, dst_cluster), destination,
+                                           dst_entrances)
+    goal_costs = {entrance: goal_costs[entrance] for entrance in dst_entrances if entrance in goal_costs}
+    local = 2
+
+    best_cost = start_costs.get(destination, inf) if direct else inf
+    best_exit = None
+
+    frontier = []
+    cost_so_far = {}
+    came_from = {}
+    for entrance in src_entrances:
+        if entrance in start_costs:
+            cost_so_far[entrance] = start_costs[entrance]
+            came_from[entrance] = None
+            heappush(frontier, (start_costs[entrance], entrance))
+    expanded = 0
+
+    while frontier:
+        current_cost, current = heappop(frontier)
+        if current_cost >= best_cost:
+            break
+        if current_cost > cost_so_far[current]:
+            continue
+        expanded += 1
+
+        if current in goal_costs and current_cost + goal_costs[current] < best_cost:
+            best_cost, best_exit = current_cost + goal_costs[current], current
+        for next_cell, edge_cost in edges[current]:
+            new_cost = current_cost + edge_cost
+            if next_cell not in cost_so_far or new_cost < cost_so_far[next_cell]:
+                cost_so_far[next_cell] = new_cost
+                came_from[next_cell] = current
+                heappush(frontier, (new_cost, next_cell))
+
+    path = None
+    if best_exit is not None:
+        route = tree_branch(came_from, best_exit)[::-1]
+        path = tree_branch(start_tree, route[0])[::-1]
+        for current, next_cell in zip(route, route[1:]):
+            if cluster_of(hierarchy, current) != cluster_of(hierarchy, next_cell):
+                path.append(next_cell)
+            else:
+                _, local_tree = cluster_search(graph, cluster_bounds(hierarchy, cluster_of(hierarchy, current)),
+                                               current, [next_cell])
+                path.extend(tree_branch(local_tree, next_cell)[-2::-1])
+                local += 1
+        path.extend(tree_branch(goal_tree, best_exit)[1:])
+    elif best_cost < inf:
+        path = tree_branch(start_tree, destination)[::-1]
+    if path:
+        print('total cost: {} '.format(best_cost))
+
+    if stats is not None:
+        stats.update(expanded=expanded, local=local)
+    return path
+
+
+def test_hierarchical_route(filename, src_waypoint, dst_waypoint, cluster_size=CLUSTER_SIZE):
+    """ Loads a level, builds its cluster hierarchy, searches for a path between the given waypoints over it, and
+    displays the result.
+
+    Args:
+        filename: The name of the text file containing the level.
+        src_waypoint: The character associated with the initial waypoint.
+        dst_waypoint: The character associated with the destination waypoint.
+        cluster_size: The side length of the clusters, in cells.
+
+    """
+    level = load_level(filename)
+    hierarchy = build_hierarchy(level, cluster_size)
+    print('clusters: {} entrances: {} '.format(hierarchy['clusters_x'] * hierarchy['clusters_y'],
+                                              len(hierarchy['edges'])))
+
+    src = cell_index(level, level['waypoints'][src_waypoint])
+    dst = cell_index(level, level['waypoints'][dst_waypoint])
+
+    stats = {}
+    path = hierarchical_shortest_path(src, dst, level, hierarchy, stats)
+    print('search stats: ' + ', '.join('{} {}'.format(key, value) for key, value in sorted(stats.items())))
+    if path:
+        show_level(level, path)
+    else:
+        print("No path possible!")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (4, 5):
+        print("usage: %s level_filename src_waypoint dst_waypoint [cluster_size]" % sys.argv[0])
+        sys.exit(-1)
+
+    test_hierarchical_route(*sys.argv[1:4], *map(int, sys.argv[4:5]))
@@ -0,0 +1,147 @@
+import sys
+from array import array
+from heapq import heappop, heappush
+from math import inf
+
+from p1 import compiled_navigation_edges, distance_field_path
+from p1_support import load_level, show_level, cell_index, update_cells, NEIGHBOR_STEPS
+
+
+class IncrementalPlanner:
+    """ Keeps a shortest-path tree from one cell of a level up to date as the level's cells change.
+
+    This is Lifelong Planning A* with a zero heuristic: every cell has its cost g as last settled and rhs, the cost
+    its cheapest neighbor currently explains. Cells where the two disagree are queued and settled in order of cost,
+    exactly like Dijkstra's algorithm, so after a change only the cells whose cost from the origin actually moves are
+    expanded again.
+
+    With a destination, searching stops as soon as the destination's cost is final, as dijkstras_shortest_path does,
+    and resumes from the same queue on the next repair. Without one, the whole tree is kept, as by
+    dijkstras_shortest_path_to_all.
+    """
+
+    def __init__(self, level, initial_position, destination=None):
+        self.level = level
+        self.source = initial_position
+        self.destination = destination
+        self.g = array('d', [inf]) * (level['width'] * level['height'])
+        self.rhs = array('d', [inf]) * (level['width'] * level['height'])
+        self.rhs[initial_position] = 0.
+        self.frontier = [(0., initial_position)]
+        self.stats = {'expanded': 0, 'pushed': 1, 'stale': 0}
+
+    def update_vertex(self, index):
+        """ Recomputes a cell's rhs from its neighbors, and queues the cell if it no longer agrees with its g. """
+        g, rhs = self.g, self.rhs
+        if index != self.source:
+            rhs[index] = min((g[neighbor] + edge_cost
+                              for neighbor, edge_cost in compiled_navigation_edges(self.level, index)), default=inf)
+        if g[index] != rhs[index]:
+            heappush(self.frontier, (min(g[index], rhs[index]), index))
+            self.stats['pushed'] += 1
+
+    def compute(self):
+        """ Settles queued cells until the destination's cost (or, without a destination, every cost) is final.
+
+        Returns:
+            The number of cells expanded by this call.
+
+        """
+        g, rhs, frontier, level = self.g, self.rhs, self.frontier, self.level
+        destination = self.destination
+        expanded = 0
+
+        while frontier:
+            key, current = frontier[0]
+            if g[current] == rhs[current] or key != min(g[current], rhs[current]):
+                heappop(frontier)
+                self.stats['stale'] += 1
+                continue
+            if destination is not None and g[destination] == rhs[destination] and g[destination] <= key:
+                break
+
+            heappop(frontier)
+            expanded += 1
+            if g[current] > rhs[current]:
+                g[current] = rhs[current]
+            else:
+                # The cell got more expensive: forget its cost and let it be settled again from its neighbors.
+                g[current] = inf
+                self.update_vertex(current)
+            for next_cell, _ in compiled_navigation_edges(level, current):
+                self.update_vertex(next_cell)
+
+        self.stats['expanded'] += expanded
+        return expanded
+
+    def repair(self, indices):
+        """ Updates the tree after the costs of the given cells changed, e.g. as returned by update_cells.
+
+        Args:
+            indices: The flat indices of the cells whose cost changed. The level's compiled adjacency must
+                already reflect the change.
+
+        Returns:
+            The number of cells expanded to repair the tree.
+
+        """
+        width, height = self.level['width'], self.level['height']
+        for index in indices:
+            x, y = index % width, index // width
+            self.update_vertex(index)
+            # A new wall has no edges left, so its former neighbors are found by position instead.
+            for dx, dy, _ in NEIGHBOR_STEPS:
+                if 0 <= x + dx < width and 0 <= y + dy < height:
+                    self.update_vertex(index + dy * width + dx)
+        return self.compute()
+
+    def cost(self, destination=None):
+        """ Returns the current minimum cost to destination (the planner's own by default), inf if unreachable. """
+        return self.g[self.destination if destination is None else destination]
+
+    def path(self, destination=None):
+        """ Returns the current cheapest path to destination (the planner's own by default), or None. """
+        return distance_field_path(self.level, self.g, self.destination if destination is None else destination)
+
+
+def test_incremental_route(filename, src_waypoint, dst_waypoint, update_batches):
+    """ Loads a level, searches for a path between the given waypoints, then applies each batch of cell updates in
+    turn and displays the repaired path.
+
+    Args:
+        filename: The name of the text file containing the level.
+        src_waypoint: The character associated with the initial waypoint.
+        dst_waypoint: The character associated with the destination waypoint.
+        update_batches: A list of lists of ((x, y), tile) updates, as taken by update_cells.
+
+    """
+    level = load_level(filename)
+    src = cell_index(level, level['waypoints'][src_waypoint])
+    dst = cell_index(level, level['waypoints'][dst_waypoint])
+
+    planner = IncrementalPlanner(level, src, dst)
+    expanded = planner.compute()
+
+    for updates in [[]] + update_batches:
+        if updates:
+            expanded = planner.repair(update_cells(level, updates))
+        print('expanded: {} total cost: {} '.format(expanded, planner.cost()))
+        path = planner.path()
+        if path:
+            show_level(level, path)
+        else:
+            print("No path possible!")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 4:
+        print("usage: %s level_filename src_waypoint dst_waypoint [x,y,tile ...]" % sys.argv[0])
+        sys.exit(-1)
+
+    # Each x,y,tile argument is applied as its own batch, e.g. 12,3,X walls off cell (12, 3).
+    batches = []
+    for update in sys.argv[4:]:
+        x, y, tile = update.split(',')
+        batches.append([((int(x), int(y)), tile or ' ')])
+
+    test_incremental_route(sys.argv[1], sys.argv[2], sys.argv[3], batches)
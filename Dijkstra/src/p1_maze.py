@@ -0,0 +1,90 @@
+import random
+import sys
+from math import isqrt
+
+from p1_support import WALL
+
+# Tile weights for open cells when no cost distribution is given: uniform floor, as in most of test_maze.
+DEFAULT_COSTS = {'1': 1.}
+
+
+def generate_maze(filename, cells, wall_density=0.3, costs=None, waypoints='ab', seed=0):
+    """ Writes a random level of about the given number of cells in the text format read by load_level.
+
+    Each cell is a wall with probability wall_density, and otherwise a digit drawn from the cost distribution.
+    Walls are independent, so at any density some open cells are walled off from the rest, and past about 0.6 the
+    open cells no longer form one large region at all. The waypoints are spread along the diagonal from the top left
+    to the bottom right corner, and a corridor of open cells (of the most common cost) is carved in a straight line
+    from each to the next, so they are always connected however dense the walls.
+
+    Args:
+        filename: The name of the text file to create.
+        cells: The approximate number of cells; the level is as close to square as possible.
+        wall_density: The probability of each cell being a wall.
+        costs: A dict mapping cost digits ('1' to '9') to their relative weights, DEFAULT_COSTS by default.
+        waypoints: The waypoint characters to place, in order along the diagonal.
+        seed: The seed for the random level, so the same arguments always write the same file.
+
+    Returns:
+        The (width, height) of the level.
+
+    """
+    costs = costs or DEFAULT_COSTS
+    assert all(len(tile) == 1 and '1' <= tile <= '9' for tile in costs), 'Error: costs must be the digits 1 to 9.'
+    rng = random.Random(seed)
+    width = max(1, isqrt(cells))
+    height = max(1, cells // width)
+
+    tiles = [WALL] + list(costs)
+    weights = [wall_density] + [(1. - wall_density) * weight / sum(costs.values()) for weight in costs.values()]
+
+    positions = []
+    for i, waypoint in enumerate(waypoints):
+        t = i / (len(waypoints) - 1) if len(waypoints) > 1 else 0.
+        positions.append((round(t * (width - 1)), round(t * (height - 1)), waypoint))
+
+    # Waypoint positions by row, keeping the last waypoint if several land in the same cell.
+    places = {}
+    for x, y, waypoint in positions:
+        places.setdefault(y, {})[x] = waypoint
+
+    # Corridor cells by row. Consecutive cells of a line touch at least diagonally, which is enough to move between.
+    corridor = {}
+    for (x0, y0, _), (x1, y1, _) in zip(positions, positions[1:]):
+        steps = max(abs(x1 - x0), abs(y1 - y0))
+        for step in range(1, steps):
+            corridor.setdefault(y0 + round((y1 - y0) * step / steps), set()).add(x0 + round((x1 - x0) * step / steps))
+    floor = max(costs, key=costs.get)
+
+    with open(filename, 'w') as f:
+        for y in range(height):
+            row = rng.choices(tiles, weights, k=width)
+            for x in corridor.get(y, ()):
+                if row[x] == WALL:
+                    row[x] = floor
+            for x, waypoint in places.get(y, {}).items():
+                row[x] = waypoint
+            f.write(''.join(row) + '\n')
+
+    return width, height
+
+
+def parse_costs(text):
+    """ Parses a cost distribution given as 'digit:weight,...' (e.g. '1:8,5:2') into a dict. """
+    costs = {}
+    for part in text.split(','):
+        tile, _, weight = part.partition(':')
+        costs[tile] = float(weight or 1.)
+    return costs
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (3, 4, 5, 6):
+        print("usage: %s output_filename cells [wall_density] [digit:weight,...] [seed]" % sys.argv[0])
+        sys.exit(-1)
+
+    wall_density = float(sys.argv[3]) if len(sys.argv) > 3 else 0.3
+    costs = parse_costs(sys.argv[4]) if len(sys.argv) > 4 else None
+    seed = int(sys.argv[5]) if len(sys.argv) > 5 else 0
+    width, height = generate_maze(sys.argv[1], int(float(sys.argv[2])), wall_density, costs, seed=seed)
+    print("Saved file: {} ({} x {})".format(sys.argv[1], width, height))
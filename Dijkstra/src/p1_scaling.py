@@ -0,0 +1,130 @@
+import json
+import os
+import platform
+import sys
+from contextlib import redirect_stdout
+from io import StringIO
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from p1 import dijkstras_shortest_path, dijkstras_shortest_path_to_all, compiled_navigation_edges
+from p1_maze import generate_maze, parse_costs
+from p1_support import load_level, save_level_costs, cell_index
+
+DEFAULT_SIZES = (10 ** 4, 10 ** 5, 10 ** 6)
+
+# The timed stages of each run, compared against a baseline by find_regressions.
+STAGES = ('load_s', 'path_s', 'to_all_s', 'csv_s')
+
+
+def benchmark_size(directory, cells, wall_density=0.3, costs=None, seed=0):
+    """ Generates one maze and times loading it, a route across it, the costs to all cells and saving them.
+
+    Args:
+        directory: Where to write the generated level and csv file.
+        cells: The approximate number of cells of the maze.
+        wall_density: The probability of each cell being a wall.
+        costs: The cost distribution of open cells, as taken by generate_maze.
+        seed: The seed for the generated maze.
+
+    Returns:
+        A dict of the run's parameters and measurements, with times in seconds.
+    """
+    level_filename = os.path.join(directory, 'maze_%d.txt' % cells)
+    csv_filename = os.path.join(directory, 'maze_%d_costs.csv' % cells)
+
+    start = perf_counter()
+    width, height = generate_maze(level_filename, cells, wall_density, costs, seed=seed)
+    result = {'cells': width * height, 'width': width, 'height': height, 'wall_density': wall_density,
+              'costs': costs, 'seed': seed, 'generate_s': perf_counter() - start}
+
+    start = perf_counter()
+    level = load_level(level_filename)
+    result['load_s'] = perf_counter() - start
+
+    src = cell_index(level, level['waypoints']['a'])
+    dst = cell_index(level, level['waypoints']['b'])
+    stats = {}
+    with redirect_stdout(StringIO()):
+        start = perf_counter()
+        path = dijkstras_shortest_path(src, dst, level, compiled_navigation_edges, stats=stats)
+        result['path_s'] = perf_counter() - start
+        result['path_expanded'] = stats['expanded']
+        result['path_length'] = len(path) if path else None
+
+        start = perf_counter()
+        costs_to_all_cells = dijkstras_shortest_path_to_all(src, level, compiled_navigation_edges)
+        result['to_all_s'] = perf_counter() - start
+        result['reached'] = len(costs_to_all_cells)
+
+        start = perf_counter()
+        save_level_costs(level, costs_to_all_cells, csv_filename)
+        result['csv_s'] = perf_counter() - start
+    result['csv_bytes'] = os.path.getsize(csv_filename)
+
+    return result
+
+
+def benchmark_scaling(sizes=DEFAULT_SIZES, wall_density=0.3, costs=None, seed=0):
+    """ Runs benchmark_size for each maze size in a scratch directory, printing a line per run.
+
+    Returns:
+        A dict describing the machine, holding the list of per-size results under 'results'.
+    """
+    report = {'python': platform.python_version(), 'machine': platform.machine(), 'results': []}
+
+    print('%10s %10s %10s %10s %10s %10s' % ('cells', 'generate s', 'load s', 'path s', 'to_all s', 'csv s'))
+    with TemporaryDirectory() as directory:
+        for cells in sizes:
+            result = benchmark_size(directory, cells, wall_density, costs, seed)
+            report['results'].append(result)
+            print('%10d %10.3f %10.3f %10.3f %10.3f %10.3f' % (result['cells'], result['generate_s'],
+                                                               *(result[stage] for stage in STAGES)))
+
+    return report
+
+
+def find_regressions(baseline, report, tolerance=0.25):
+    """ Compares two benchmark reports, listing each stage that got slower by more than tolerance.
+
+    Args:
+        baseline: An earlier report, as written by benchmark_scaling.
+        report: The report to check.
+        tolerance: The allowed fractional slowdown, e.g. 0.25 for 25%.
+
+    Returns:
+        A list of (cells, stage, baseline seconds, new seconds) tuples, one per regression.
+    """
+    before = {(result['cells'], result['wall_density'], json.dumps(result['costs'])): result
+              for result in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        old = before.get((result['cells'], result['wall_density'], json.dumps(result['costs'])))
+        if old is not None:
+            for stage in STAGES:
+                if result[stage] > old[stage] * (1. + tolerance):
+                    regressions.append((result['cells'], stage, old[stage], result[stage]))
+    return regressions
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3, 4, 5, 6):
+        print("usage: %s output.json [baseline.json|-] [cells,...] [wall_density] [digit:weight,...]" % sys.argv[0])
+        sys.exit(-1)
+
+    baseline_filename = sys.argv[2] if len(sys.argv) > 2 and sys.argv[2] != '-' else None
+    sizes = [int(float(cells)) for cells in sys.argv[3].split(',')] if len(sys.argv) > 3 else DEFAULT_SIZES
+    wall_density = float(sys.argv[4]) if len(sys.argv) > 4 else 0.3
+    costs = parse_costs(sys.argv[5]) if len(sys.argv) > 5 else None
+
+    report = benchmark_scaling(sizes, wall_density, costs)
+    with open(sys.argv[1], 'w') as f:
+        json.dump(report, f, indent=1)
+    print("Saved file:", sys.argv[1])
+
+    if baseline_filename is not None:
+        with open(baseline_filename) as f:
+            regressions = find_regressions(json.load(f), report)
+        for cells, stage, old, new in regressions:
+            print('regression: %s at %d cells took %.3f s, was %.3f s' % (stage, cells, new, old))
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from io import StringIO
+from time import perf_counter
+
+from p1 import compiled_navigation_edges, ROUTE_ALGORITHMS
+from p1_support import load_level, cell_index, index_cell
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+def latency_percentiles(latencies, percentiles=LATENCY_PERCENTILES):
+    """ Returns a dict mapping 'p<n>' to the nearest-rank n-th percentile of the given latencies. """
+    ordered = sorted(latencies)
+    if not ordered:
+        return {}
+    return {'p%d' % p: ordered[min(len(ordered) - 1, max(0, -(-p * len(ordered) // 100) - 1))] for p in percentiles}
+
+
+class RouteServer:
+    """ Answers batches of route queries over a socket, keeping every level it has loaded resident.
+
+    The protocol is one JSON document per line. A client sends {"id": ..., "queries": [...]} where each query is
+    {"level": filename, "src": waypoint, "dst": waypoint} with an optional "algorithm" (one of ROUTE_ALGORITHMS).
+    The server replies with one line per query as soon as it is answered, holding its "index" in the batch and
+    either its "cost", "path" (list of [x, y] cells) and "seconds", or an "error". A final line holds the batch's
+    "done" count and the "latency" percentiles of its queries. Sending {"stats": true} instead returns the
+    percentiles over every query served so far. A line that is not such a request, or a query that is not such an
+    object, gets an "error" reply of its own and the connection carries on.
+    """
+
+    def __init__(self):
+        self.levels = {}
+        self.latencies = []
+        # Searches print their costs, so they run one at a time on a thread whose output can be redirected.
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def level(self, filename):
+        """ Returns the loaded level for filename, loading it again only if the file has changed since. """
+        path = os.path.abspath(filename)
+        mtime = os.stat(path).st_mtime_ns
+        if path not in self.levels or self.levels[path][0] != mtime:
+            self.levels[path] = mtime, load_level(path)
+        return self.levels[path][1]
+
+    def route(self, query):
+        """ Answers one query, returning the reply to send for it. """
+        start = perf_counter()
+        if not isinstance(query, dict) or not isinstance(query.get('level'), str):
+            return {'error': 'TypeError: a query must be an object with a "level" filename'}
+        try:
+            level = self.level(query['level'])
+            src = cell_index(level, level['waypoints'][query['src']])
+            dst = cell_index(level, level['waypoints'][query['dst']])
+            search = ROUTE_ALGORITHMS[query.get('algorithm', 'dijkstra')]
+        except (KeyError, OSError, TypeError, ValueError) as e:
+            return {'error': '{}: {}'.format(type(e).__name__, e)}
+
+        with redirect_stdout(StringIO()):
+            path = search(src, dst, level, compiled_navigation_edges)
+        cost = sum(dict(compiled_navigation_edges(level, a))[b] for a, b in zip(path, path[1:])) if path else None
+        return {'cost': cost,
+                'path': [index_cell(level, cell) for cell in path] if path else None,
+                'seconds': perf_counter() - start}
+
+    async def handle(self, reader, writer):
+        """ Serves one connection until the client closes it. """
+        loop = asyncio.get_running_loop()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict) or not isinstance(request.get('queries', []), list):
+                    raise TypeError('a request must be an object, with a list of "queries"')
+            except (TypeError, ValueError) as e:
+                writer.write((json.dumps({'error': '{}: {}'.format(type(e).__name__, e)}) + '\n').encode())
+                await writer.drain()
+                continue
+
+            if request.get('stats'):
+                reply = {'queries': len(self.latencies), 'latency': latency_percentiles(self.latencies)}
+                writer.write((json.dumps(reply) + '\n').encode())
+                await writer.drain()
+                continue
+
+            batch_latencies = []
+            for index, query in enumerate(request.get('queries', [])):
+                reply = await loop.run_in_executor(self.executor, self.route, query)
+                reply.update(id=request.get('id'), index=index)
+                if 'seconds' in reply:
+                    batch_latencies.append(reply['seconds'])
+                writer.write((json.dumps(reply) + '\n').encode())
+                await writer.drain()
+
+            self.latencies.extend(batch_latencies)
+            summary = {'id': request.get('id'), 'done': len(request.get('queries', [])),
+                       'latency': latency_percentiles(batch_latencies)}
+            writer.write((json.dumps(summary) + '\n').encode())
+            await writer.drain()
+
+        writer.close()
+        await writer.wait_closed()
+
+
+async def serve(address):
+    """ Runs a RouteServer forever on a TCP port of localhost, or on a Unix socket if address is a path. """
+    server = RouteServer()
+    if isinstance(address, int):
+        listener = await asyncio.start_server(server.handle, DEFAULT_HOST, address)
+    else:
+        listener = await asyncio.start_unix_server(server.handle, address)
+    print('Serving routes on', address)
+    async with listener:
+        await listener.serve_forever()
+
+
+async def request_routes(address, queries, request_id=None):
+    """ Sends one batch of queries to a running server and collects its replies.
+
+    Args:
+        address: The server's TCP port on localhost, or the path of its Unix socket.
+        queries: A list of {"level", "src", "dst"[, "algorithm"]} dicts.
+        request_id: An identifier echoed back in every reply.
+
+    Returns:
+        The list of per-query replies, in the order they arrived, and the batch summary.
+    """
+    if isinstance(address, int):
+        reader, writer = await asyncio.open_connection(DEFAULT_HOST, address)
+    else:
+        reader, writer = await asyncio.open_unix_connection(address)
+
+    writer.write((json.dumps({'id': request_id, 'queries': queries}) + '\n').encode())
+    await writer.drain()
+
+    replies = []
+    while True:
+        reply = json.loads(await reader.readline())
+        if 'done' in reply:
+            break
+        replies.append(reply)
+
+    writer.close()
+    await writer.wait_closed()
+    return replies, reply
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        print("usage: %s [port|socket_path]" % sys.argv[0])
+        sys.exit(-1)
+
+    address = sys.argv[1] if len(sys.argv) == 2 else str(DEFAULT_PORT)
+    asyncio.run(serve(int(address) if address.isdigit() else address))
@@ -1,114 +1,562 @@
 # Support code for P1
 
-from math import inf
-from csv import writer
+import gzip
+import os
+import re
+import struct
+from array import array
+from ast import literal_eval
+from collections.abc import Mapping, Set
+from hashlib import sha256
+from io import TextIOBase
+from math import inf, sqrt
+from mmap import mmap, ACCESS_READ
+from sys import byteorder, maxsize
+from csv import reader, writer
 
 WALL = 'X'
+VOID = ' '
 
+# Tiles are stored one byte per cell; anything that is not a wall, a digit or a waypoint renders as void.
+TILE_TABLE = bytes(c if chr(c) == WALL or '0' <= chr(c) <= '9' or 'a' <= chr(c) <= 'z' else ord(VOID)
+                   for c in range(256))
 
-def load_level(filename):
+# Cost of stepping onto a tile, 0. meaning the tile cannot be entered.
+TILE_COSTS = tuple(float(chr(c)) if '0' <= chr(c) <= '9' else 1. if 'a' <= chr(c) <= 'z' else 0.
+                   for c in range(256))
+
+WAYPOINT_PATTERN = re.compile(rb'[a-z]')
+
+# Distance map formats understood by save_level_costs and load_level_costs. The raw float32 format starts with a
+# header of its magic, the map's width and height, and the level cell its top left corner lies on.
+DISTANCE_MAP_FORMATS = ('.csv', '.npy', '.f32', '.f32.gz')
+DISTANCE_MAP_MAGIC = b'DMF1'
+DISTANCE_MAP_HEADER = struct.Struct('<4sIIii')
+NPY_MAGIC = b'\x93NUMPY\x01\x00'
+
+# Where computed distance fields are kept between runs, and how large that directory may grow.
+CACHE_DIR = 'distance_cache'
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# (dx, dy, factor) for each move; an edge costs factor * (cost of one cell + cost of the other).
+NEIGHBOR_STEPS = ((1, 0, 0.5), (0, 1, 0.5), (-1, 0, 0.5), (0, -1, 0.5),
+                  (-1, -1, 0.5 * sqrt(2)), (1, -1, 0.5 * sqrt(2)), (-1, 1, 0.5 * sqrt(2)), (1, 1, 0.5 * sqrt(2)))
+
+
+class LevelSpaces(Mapping):
+    """ Read-only view of a level's open cells as the original {(x, y): cost} dict. """
+
+    def __init__(self, level):
+        self.level = level
+
+    def __getitem__(self, cell):
+        index = cell_index(self.level, cell)
+        if index is None or self.level['costs'][index] <= 0.:
+            raise KeyError(cell)
+        return self.level['costs'][index]
+
+    def __iter__(self):
+        width = self.level['width']
+        for index, cost in enumerate(self.level['costs']):
+            if cost > 0.:
+                yield index % width, index // width
+
+    def __len__(self):
+        return sum(1 for cost in self.level['costs'] if cost > 0.)
+
+
+class LevelWalls(Set):
+    """ Read-only view of a level's walls as the original set of (x, y) cells. """
+
+    def __init__(self, level):
+        self.level = level
+
+    def __contains__(self, cell):
+        index = cell_index(self.level, cell)
+        return index is not None and self.level['tiles'][index] == ord(WALL)
+
+    def __iter__(self):
+        width = self.level['width']
+        for index, tile in enumerate(self.level['tiles']):
+            if tile == ord(WALL):
+                yield index % width, index // width
+
+    def __len__(self):
+        return self.level['tiles'].count(ord(WALL))
+
+
+def cell_index(level, cell):
+    """ Converts an (x, y) cell into its flat index, or None if it lies outside the level. """
+    x, y = cell
+    if 0 <= x < level['width'] and 0 <= y < level['height']:
+        return y * level['width'] + x
+    return None
+
+
+def index_cell(level, index):
+    """ Converts a flat cell index back into its (x, y) cell. """
+    return index % level['width'], index // level['width']
+
+
+def level_rows(data, y_lo=0, y_hi=maxsize):
+    """ Yields (row number, start offset, end offset) for each line of a level file's bytes, within rows y_lo..y_hi.
+
+    Lines are found with bytes.find, so nothing before y_lo is decoded and nothing after y_hi is read at all.
+    """
+    start, j = 0, 0
+    while start < len(data) and j <= y_hi:
+        end = data.find(b'\n', start)
+        if end == -1:
+            end = len(data)
+        if j >= y_lo:
+            yield j, start, end - 1 if end > start and data[end - 1] == ord('\r') else end
+        start, j = end + 1, j + 1
+
+
+def load_level(filename, window=None):
     """ Loads a level from a given text file.
 
+    The file is memory mapped and parsed row by row straight into the tile grid, so only the grid itself (and only
+    the requested window of it) is ever held in memory.
+
     Args:
         filename: The name of the txt file containing the maze.
+        window: If given, the (x_lo, x_hi, y_lo, y_hi) inclusive bounds, lo <= hi, of the only part of the level to
+            load; rows ending before x_lo load as empty. Its cells are then numbered from the window's corner,
+            which is kept as the level's 'origin'.
 
     Returns:
-        The loaded level (dict) containing the locations of walls (set), the locations of spaces (dict), and
-        a mapping of locations to waypoints (dict).
+        The loaded level (dict). Cells are addressed by the flat index y * width + x into 'tiles' (bytearray of
+        tile characters) and 'costs' (array of floats, 0. where the cell cannot be entered). 'bounds' holds the
+        (x_lo, x_hi, y_lo, y_hi) box around walls and spaces, and 'waypoints' maps characters to (x, y) cells.
+        'walls' (set-like) and 'spaces' (dict-like) are views kept for code written against the tuple form,
+        'min_cost' is the cheapest cell cost (a lower bound on it once update_cells has raised costs), and
+        'adjacency' holds the compiled navigation edges (see compile_adjacency).
 
     """
-    walls = set()
-    spaces = {}
-    waypoints = {}
-    with open(filename, "r") as f:
-
-        for j, line in enumerate(f.readlines()):
-            for i, char in enumerate(line):
-                if char == '\n':
-                    continue
-                elif char == WALL:
-                    walls.add((i, j))
-                elif char.isnumeric():
-                    spaces[(i, j)] = float(char)
-                elif char.islower():
-                    spaces[(i, j)] = 1.
-                    waypoints[char] = (i, j)
-
-    level = {'walls': walls,
-             'spaces': spaces,
+    x_lo, x_hi, y_lo, y_hi = window if window is not None else (0, maxsize, 0, maxsize)
+    assert 0 <= x_lo <= x_hi and 0 <= y_lo <= y_hi, 'Error: window must be (x_lo, x_hi, y_lo, y_hi) with lo <= hi.'
+
+    with open(filename, 'rb') as f:
+        data = mmap(f.fileno(), 0, access=ACCESS_READ) if os.fstat(f.fileno()).st_size else b''
+
+    try:
+        # Rows ending before x_lo are empty, not of negative length.
+        rows = [(start + x_lo, max(start + x_lo, min(end, start + x_hi + 1)))
+                for _, start, end in level_rows(data, y_lo, y_hi)]
+        width = max((end - start for start, end in rows), default=0)
+        height = len(rows)
+
+        tiles = bytearray(VOID.encode()) * (width * height)
+        waypoints = {}
+        for j, (start, end) in enumerate(rows):
+            if end > start:
+                row = data[start:end].translate(TILE_TABLE)
+                tiles[j * width:j * width + len(row)] = row
+                for match in WAYPOINT_PATTERN.finditer(row):
+                    waypoints[match.group().decode()] = (match.start(), j)
+    finally:
+        if isinstance(data, mmap):
+            data.close()
+
+    level = {'width': width,
+             'height': height,
+             'origin': (x_lo, y_lo),
+             'tiles': tiles,
+             'costs': array('d', map(TILE_COSTS.__getitem__, tiles)),
              'waypoints': waypoints}
 
+    level['min_cost'] = min((cost for cost in level['costs'] if cost > 0.), default=0.)
+    level['bounds'] = level_bounds(level)
+    level['walls'] = LevelWalls(level)
+    level['spaces'] = LevelSpaces(level)
+    level['adjacency'] = compile_adjacency(level)
+
     return level
 
 
-def show_level(level, path=[]):
-    """ Displays a level via a print statement.
+def compile_adjacency(level):
+    """ Precomputes the navigation edges of every cell in compressed sparse row form.
+
+    The edges leaving cell i are neighbors[offsets[i]:offsets[i + 1]], with matching costs in edge_costs.
 
     Args:
-        level: The level to be displayed.
-        path: A continuous path to be displayed over the level, if provided.
+        level: A loaded level, containing its width, height and flat cell costs.
+
+    Returns:
+        A dict with the 'offsets', 'neighbors' (arrays of ints) and 'edge_costs' (array of floats).
+
+    """
+    width, height, costs = level['width'], level['height'], level['costs']
+    offsets = array('i', [0])
+    neighbors = array('i')
+    edge_costs = array('d')
+
+    for index, cell_cost in enumerate(costs):
+        if cell_cost > 0.:
+            x, y = index % width, index // width
+            for dx, dy, factor in NEIGHBOR_STEPS:
+                if 0 <= x + dx < width and 0 <= y + dy < height:
+                    neighbor = index + dy * width + dx
+                    neighbor_cost = costs[neighbor]
+                    if neighbor_cost > 0.:
+                        neighbors.append(neighbor)
+                        edge_costs.append(factor * (cell_cost + neighbor_cost))
+        offsets.append(len(neighbors))
+
+    return {'offsets': offsets, 'neighbors': neighbors, 'edge_costs': edge_costs}
+
+
+def update_cells(level, updates):
+    """ Changes tiles of a loaded level in place, keeping its costs, waypoints and compiled adjacency in step.
+
+    Args:
+        level: A loaded level.
+        updates: An iterable of ((x, y), tile) pairs, where tile is the character the cell becomes (e.g. WALL, a
+            digit for a new cost, or VOID).
+
+    Returns:
+        The sorted list of flat indices of the cells whose cost changed.
 
     """
-    xs, ys = zip(*(list(level['spaces'].keys()) + list(level['walls'])))
-    x_lo, x_hi = min(xs), max(xs)
-    y_lo, y_hi = min(ys), max(ys)
+    tiles, costs = level['tiles'], level['costs']
+    changed = []
+    reshaped = False
+
+    for cell, tile in updates:
+        index = cell_index(level, cell)
+        tile = TILE_TABLE[ord(tile)]
+        if index is None or tiles[index] == tile:
+            continue
+
+        old_tile, tiles[index] = tiles[index], tile
+        level.pop('raster', None)
+        reshaped = reshaped or ord(VOID) in (old_tile, tile)
+        if chr(old_tile) in level['waypoints'] and level['waypoints'][chr(old_tile)] == cell:
+            del level['waypoints'][chr(old_tile)]
+        if 'a' <= chr(tile) <= 'z':
+            level['waypoints'][chr(tile)] = cell
+
+        if costs[index] != TILE_COSTS[tile]:
+            costs[index] = TILE_COSTS[tile]
+            changed.append(index)
+            # Only ever lowered: searches use min_cost as a lower bound, which raising a cost leaves true.
+            if costs[index] > 0. and (costs[index] < level['min_cost'] or not level['min_cost']):
+                level['min_cost'] = costs[index]
+
+    if reshaped:
+        level['bounds'] = level_bounds(level)
+    if changed:
+        patch_adjacency(level, changed)
+    return sorted(set(changed))
+
+
+def patch_adjacency(level, indices):
+    """ Recompiles the navigation edges of the given cells and their neighbors after their costs changed.
+
+    The other cells' edges are copied across as whole slices, so the work done in Python grows with the number of
+    changed cells rather than with the size of the level (except for renumbering offsets once a cell gains or loses
+    edges).
+
+    Args:
+        level: A loaded level, containing its compiled adjacency.
+        indices: The flat indices of the cells whose costs changed.
+
+    """
+    width, height, costs = level['width'], level['height'], level['costs']
+    adjacency = level['adjacency']
+    offsets, neighbors, edge_costs = adjacency['offsets'], adjacency['neighbors'], adjacency['edge_costs']
+
+    # A cost change alters the edges of the cell itself and of every neighbor stepping onto it.
+    rows = set()
+    for index in indices:
+        x, y = index % width, index // width
+        rows.add(index)
+        for dx, dy, _ in NEIGHBOR_STEPS:
+            if 0 <= x + dx < width and 0 <= y + dy < height:
+                rows.add(index + dy * width + dx)
+
+    new_offsets, new_neighbors, new_edge_costs = array('i', [0]), array('i'), array('d')
+    copied = 0
+    for row in sorted(rows) + [width * height]:
+        # Copy the untouched rows copied..row - 1, shifting their offsets by however far the arrays have moved.
+        start, end = offsets[copied], offsets[row]
+        shift = len(new_neighbors) - start
+        new_neighbors.extend(neighbors[start:end])
+        new_edge_costs.extend(edge_costs[start:end])
+        if shift:
+            new_offsets.extend(offset + shift for offset in offsets[copied + 1:row + 1])
+        else:
+            new_offsets.extend(offsets[copied + 1:row + 1])
+        if row == width * height:
+            break
+
+        cell_cost = costs[row]
+        if cell_cost > 0.:
+            x, y = row % width, row // width
+            for dx, dy, factor in NEIGHBOR_STEPS:
+                if 0 <= x + dx < width and 0 <= y + dy < height:
+                    neighbor = row + dy * width + dx
+                    neighbor_cost = costs[neighbor]
+                    if neighbor_cost > 0.:
+                        new_neighbors.append(neighbor)
+                        new_edge_costs.append(factor * (cell_cost + neighbor_cost))
+        new_offsets.append(len(new_neighbors))
+        copied = row + 1
 
-    path_cells = set(path)
+    adjacency.update(offsets=new_offsets, neighbors=new_neighbors, edge_costs=new_edge_costs)
 
-    chars = []
-    inverted_waypoints = {point: char for char, point in level['waypoints'].items()}
 
-    for j in range(y_lo, y_hi + 1):
-        for i in range(x_lo, x_hi + 1):
+def level_bounds(level):
+    """ Finds the bounding box (x_lo, x_hi, y_lo, y_hi) of all walls and spaces in a level. """
+    width, tiles = level['width'], level['tiles']
+    rows = [j for j in range(level['height']) if tiles[j * width:(j + 1) * width].strip()]
+    if not rows:
+        return 0, -1, 0, -1
+    x_lo, x_hi = width, -1
+    for j in rows:
+        row = tiles[j * width:(j + 1) * width]
+        x_lo = min(x_lo, len(row) - len(row.lstrip()))
+        x_hi = max(x_hi, len(row.rstrip()) - 1)
+    return x_lo, x_hi, rows[0], rows[-1]
 
-            cell = (i, j)
-            if cell in path_cells:
-                chars.append('*')
-            elif cell in level['walls']:
-                chars.append('X')
-            elif cell in inverted_waypoints:
-                chars.append(inverted_waypoints[cell])
-            elif cell in level['spaces']:
-                chars.append(str(int(level['spaces'][cell])))
-            else:
-                chars.append(' ')
 
-        chars.append('\n')
+def flat_indices(level, cells):
+    """ Yields the flat index of each cell, given either as an (x, y) tuple or already as an index. """
+    for cell in cells:
+        yield cell if isinstance(cell, int) else cell_index(level, cell)
 
-    print(''.join(chars))
 
+def level_raster(level):
+    """ Returns the text of a level's bounding box with no path drawn, as bytes, rendering it on first use.
 
-def save_level_costs(level, costs, filename='distance_map.csv'):
+    The raster is kept in the level as 'raster' and dropped by update_cells whenever a tile changes.
+    """
+    if 'raster' not in level:
+        width, tiles = level['width'], level['tiles']
+        x_lo, x_hi, y_lo, y_hi = level['bounds']
+        level['raster'] = b''.join(bytes(tiles[j * width + x_lo:j * width + x_hi + 1]) + b'\n'
+                                   for j in range(y_lo, y_hi + 1))
+    return level['raster']
+
+
+def render_level(level, path=()):
+    """ Draws a path over a copy of the level's raster, touching only the path's cells.
+
+    Args:
+        level: The level to be rendered.
+        path: The cells to mark, as (x, y) cells or flat indices. Cells outside the level's bounds are skipped.
+
+    Returns:
+        The rendered lines as a bytearray, each ending in a newline.
+    """
+    width = level['width']
+    x_lo, x_hi, y_lo, y_hi = level['bounds']
+    stride = x_hi - x_lo + 2
+
+    raster = bytearray(level_raster(level))
+    for index in flat_indices(level, path):
+        if index is not None:
+            x, y = index % width, index // width
+            if x_lo <= x <= x_hi and y_lo <= y <= y_hi:
+                raster[(y - y_lo) * stride + x - x_lo] = ord('*')
+    return raster
+
+
+def show_level(level, path=[], stream=None):
+    """ Displays a level via a print statement.
+
+    Args:
+        level: The level to be displayed.
+        path: A continuous path to be displayed over the level, if provided, as (x, y) cells or flat indices.
+        stream: If given, a text or binary stream (e.g. an open file) to write the level to instead of printing it.
+
+    """
+    text = render_level(level, path) + b'\n'
+    if stream is None:
+        print(text[:-1].decode('latin-1'))
+    elif isinstance(stream, TextIOBase):
+        stream.write(text.decode('latin-1'))
+    else:
+        stream.write(text)
+
+
+def save_level_costs(level, costs, filename='distance_map.csv', origin=None):
     """ Displays cell costs from an origin point over the given level.
 
+    The format follows the filename's extension: '.csv' text rows, or one of the binary formats read back by
+    load_level_costs, '.npy' (a NumPy array), '.f32' (raw float32 behind a DISTANCE_MAP_HEADER) or '.f32.gz'
+    (the same, gzip compressed). Binary formats store costs as float32, which is much smaller and faster to read
+    than text but keeps only about 7 significant digits.
+
     Args:
         level: The level to be displayed.
-        costs: A dictionary containing a mapping of cells to costs from an origin point.
-        filename: The name of the csv file to be created.
+        costs: A dictionary containing a mapping of cells (as (x, y) tuples or flat indices) to costs from an
+            origin point, or a flat sequence holding the cost of every cell.
+        filename: The name of the file to be created.
+        origin: The flat index of the origin cell, if known, which csv files give as 0 however its cost is stored.
 
     """
-    xs, ys = zip(*(list(level['spaces'].keys()) + list(level['walls'])))
-    x_lo, x_hi = min(xs), max(xs)
-    y_lo, y_hi = min(ys), max(ys)
-
-    rows = []
-    for j in range(y_lo, y_hi + 1):
-        row = []
-
-        for i in range(x_lo, x_hi + 1):
-            cell = (i, j)
-            if cell not in costs:
-                row.append(inf)
-            else:
-                row.append(costs[cell])
-
-        rows.append(row)
-
-    assert '.csv' in filename, 'Error: filename does not contain file type.'
-    with open(filename, 'w', newline='') as f:
-        csv_writer = writer(f)
+    width = level['width']
+    x_lo, x_hi, y_lo, y_hi = level['bounds']
+
+    if isinstance(costs, Mapping):
+        grid = [inf] * (width * level['height'])
+        for index, cost in zip(flat_indices(level, costs.keys()), costs.values()):
+            if index is not None:
+                grid[index] = cost
+    else:
+        grid = costs
+
+    rows = [grid[j * width + x_lo:j * width + x_hi + 1] for j in range(y_lo, y_hi + 1)]
+
+    assert filename.endswith(DISTANCE_MAP_FORMATS), 'Error: filename does not contain file type.'
+    if filename.endswith('.csv'):
+        with open(filename, 'w', newline='') as f:
+            csv_writer = writer(f)
+            for j, row in zip(range(y_lo, y_hi + 1), rows):
+                if origin is not None and j * width + x_lo <= origin <= j * width + x_hi:
+                    row = list(row)
+                    row[origin - j * width - x_lo] = 0
+                csv_writer.writerow(row)
+    else:
+        values = array('f')
         for row in rows:
-            csv_writer.writerow(row)
-            
-    
-    print("Saved file:", filename)
\ No newline at end of file
+            values.extend(array('f', row))
+        if byteorder != 'little':
+            values.byteswap()
+
+        shape = (y_hi - y_lo + 1, x_hi - x_lo + 1)
+        if filename.endswith('.npy'):
+            header = "{{'descr': '<f4', 'fortran_order': False, 'shape': ({}, {}), }}".format(*shape)
+            header += ' ' * (-(len(NPY_MAGIC) + 2 + len(header) + 1) % 64) + '\n'
+            header = NPY_MAGIC + len(header).to_bytes(2, 'little') + header.encode('latin-1')
+        else:
+            header = DISTANCE_MAP_HEADER.pack(DISTANCE_MAP_MAGIC, shape[1], shape[0], x_lo, y_lo)
+
+        with (gzip.open if filename.endswith('.gz') else open)(filename, 'wb') as f:
+            f.write(header)
+            values.tofile(f)
+
+    print("Saved file:", filename)
+
+
+def load_level_costs(filename):
+    """ Reads a distance map back from any of the formats written by save_level_costs.
+
+    The '.npy' and '.f32' formats are memory mapped, so their costs are read from the file only as they are used.
+
+    Args:
+        filename: The name of the distance map file.
+
+    Returns:
+        A dict holding the map's 'width' and 'height', its 'origin' (the level cell of its top left corner, or None
+        for csv and npy files, which do not record it) and 'costs', a flat read-only sequence with the cost of cell
+        (x, y) of the map at index y * width + x.
+
+    """
+    assert filename.endswith(DISTANCE_MAP_FORMATS), 'Error: filename does not contain file type.'
+    origin = None
+
+    if filename.endswith('.csv'):
+        with open(filename, newline='') as f:
+            rows = [[float(cost) for cost in row] for row in reader(f)]
+        width, height = max(map(len, rows), default=0), len(rows)
+        return {'width': width, 'height': height, 'origin': origin,
+                'costs': array('d', [cost for row in rows for cost in row + [inf] * (width - len(row))])}
+
+    if filename.endswith('.gz'):
+        with gzip.open(filename, 'rb') as f:
+            data = f.read()
+    else:
+        with open(filename, 'rb') as f:
+            data = mmap(f.fileno(), 0, access=ACCESS_READ)
+
+    if filename.endswith('.npy'):
+        assert data[:len(NPY_MAGIC)] == NPY_MAGIC, 'Error: not a npy file.'
+        offset = len(NPY_MAGIC) + 2 + int.from_bytes(data[len(NPY_MAGIC):len(NPY_MAGIC) + 2], 'little')
+        header = literal_eval(bytes(data[len(NPY_MAGIC) + 2:offset]).decode('latin-1'))
+        assert header['descr'] == '<f4' and not header['fortran_order'], 'Error: unsupported npy layout.'
+        height, width = header['shape']
+    else:
+        magic, width, height, x_lo, y_lo = DISTANCE_MAP_HEADER.unpack_from(data)
+        assert magic == DISTANCE_MAP_MAGIC, 'Error: not a distance map file.'
+        offset, origin = DISTANCE_MAP_HEADER.size, (x_lo, y_lo)
+
+    costs = memoryview(data)[offset:offset + width * height * 4].cast('f')
+    if byteorder != 'little':
+        costs = array('f', costs)
+        costs.byteswap()
+    return {'width': width, 'height': height, 'origin': origin, 'costs': costs}
+
+
+def distance_cache_key(filename, src_waypoint):
+    """ Names the distance field of a waypoint by a hash of the level file's contents and the waypoint. """
+    digest = sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    digest.update(src_waypoint.encode())
+    return digest.hexdigest()
+
+
+def load_distance_field(key, cache_dir=CACHE_DIR):
+    """ Maps a cached distance field into memory.
+
+    Args:
+        key: The field's cache key, from distance_cache_key.
+        cache_dir: The directory holding the cache.
+
+    Returns:
+        A read-only flat sequence of per-cell costs (inf where unreachable), or None if the field is not cached.
+    """
+    path = os.path.join(cache_dir, key + '.f64')
+    try:
+        with open(path, 'rb') as f:
+            field = mmap(f.fileno(), 0, access=ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    # Touch the entry so eviction drops the least recently used fields first.
+    os.utime(path)
+    return memoryview(field).cast('d')
+
+
+def store_distance_field(level, key, costs, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """ Writes a distance field to the cache as raw native doubles, then evicts old entries past max_bytes.
+
+    Args:
+        level: The level the costs were calculated over.
+        key: The field's cache key, from distance_cache_key.
+        costs: A dictionary mapping flat cell indices to costs from the origin point.
+        cache_dir: The directory holding the cache.
+        max_bytes: The size the cache directory is trimmed back to.
+
+    """
+    field = array('d', [inf]) * (level['width'] * level['height'])
+    for index, cost in costs.items():
+        field[index] = cost
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, key + '.f64')
+    with open(path + '.tmp', 'wb') as f:
+        field.tofile(f)
+    os.replace(path + '.tmp', path)
+
+    evict_distance_fields(cache_dir, max_bytes)
+
+
+def evict_distance_fields(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """ Deletes the least recently used cached fields until the cache fits in max_bytes. """
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith('.f64'):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
@@ -0,0 +1,148 @@
+import csv
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from io import StringIO
+from time import perf_counter
+
+import numpy
+
+from p2_meshbuilder import load_map_image
+from p2_meshfile import load_mesh
+from p2_pathfinder import find_path
+
+LATENCY_PERCENTILES = (50, 90, 99)
+# Queries sent to a worker process at a time.
+CHUNK_SIZE = 100
+
+# The mesh of each worker process, loaded once by load_worker_mesh.
+worker_mesh = None
+
+
+def latency_percentiles(latencies, percentiles=LATENCY_PERCENTILES):
+    """
+    Returns a dict mapping 'p<n>' to the nearest-rank n-th percentile of the given latencies
+    """
+    ordered = sorted(latencies)
+    if not ordered:
+        return {}
+    return {'p%d' % p: ordered[min(len(ordered) - 1, max(0, -(-p * len(ordered) // 100) - 1))] for p in percentiles}
+
+
+def random_pairs(image, count, seed=0):
+    """
+    Picks count (source, destination) pairs of walkable (255) pixels of a map image, the same ones for the same seed
+    """
+    walkable = numpy.argwhere(image == 255)
+    assert len(walkable), 'Error: the map has no walkable pixels.'
+    picks = numpy.random.default_rng(seed).integers(len(walkable), size=(count, 2))
+    return [(tuple(walkable[a].tolist()), tuple(walkable[b].tolist())) for a, b in picks.tolist()]
+
+
+def read_pairs(filename):
+    """
+    Reads (source, destination) pairs from a csv file with one 'source_x,source_y,destination_x,destination_y' line
+    per query, x being the pixel row as in find_path
+    """
+    with open(filename, newline='') as f:
+        return [((int(row[0]), int(row[1])), (int(row[2]), int(row[3]))) for row in csv.reader(f) if row]
+
+
+def run_queries(mesh, pairs, smooth=False):
+    """
+    Runs find_path over each (source, destination) pair
+
+    Returns:
+
+        A list with, for each pair, its latency in seconds, the number of boxes expanded and whether a path was found
+    """
+    results = []
+    # find_path prints when there is no path, which is noise in a batch.
+    with redirect_stdout(StringIO()):
+        for source_point, destination_point in pairs:
+            stats = {}
+            start = perf_counter()
+            path, _ = find_path(source_point, destination_point, mesh, stats, smooth)
+            results.append((perf_counter() - start, stats.get('expanded', 0), bool(path)))
+    return results
+
+
+def load_worker_mesh(mesh_filename):
+    """
+    Loads the mesh a worker process answers its queries from, once as the process starts
+    """
+    global worker_mesh
+    worker_mesh = load_mesh(mesh_filename)
+
+
+def run_worker_queries(pairs, smooth):
+    """
+    Runs a chunk of queries in a worker process, as run_queries
+    """
+    return run_queries(worker_mesh, pairs, smooth)
+
+
+def run_batch(map_filename, mesh_filename, pairs=None, count=1000, processes=1, smooth=False, seed=0):
+    """
+    Loads a map and its mesh once and times find_path over a batch of queries
+
+    Args:
+        map_filename: map image, from which random queries are drawn
+        mesh_filename: its mesh, a mesh file or .mesh.pickle
+        pairs: the (source, destination) pixel pairs to run, by default count random pairs of walkable pixels
+        count: number of random pairs when none are given
+        processes: number of worker processes, each loading the mesh once; 1 runs the queries in this process
+        smooth: whether find_path pulls the paths taut
+        seed: seed of the random pairs
+
+    Returns:
+
+        A dict of the batch's parameters and measurements, with times in seconds
+    """
+    start = perf_counter()
+    image = load_map_image(map_filename)
+    mesh = load_mesh(mesh_filename)
+    load_s = perf_counter() - start
+
+    if pairs is None:
+        pairs = random_pairs(image, count, seed)
+
+    start = perf_counter()
+    if processes > 1:
+        chunks = [pairs[i:i + CHUNK_SIZE] for i in range(0, len(pairs), CHUNK_SIZE)]
+        with ProcessPoolExecutor(processes, initializer=load_worker_mesh, initargs=(mesh_filename,)) as executor:
+            results = [result for chunk in executor.map(run_worker_queries, chunks, [smooth] * len(chunks))
+                       for result in chunk]
+    else:
+        results = run_queries(mesh, pairs, smooth)
+    seconds = perf_counter() - start
+
+    latencies = [latency for latency, _, _ in results]
+    expanded = [boxes for _, boxes, _ in results]
+    return {'map': map_filename, 'mesh': mesh_filename, 'processes': processes, 'smooth': smooth,
+            'queries': len(results), 'found': sum(found for _, _, found in results), 'load_s': load_s,
+            'seconds': seconds, 'queries_per_s': len(results) / seconds if seconds else None,
+            'expanded': sum(expanded), 'mean_expanded': sum(expanded) / len(expanded) if expanded else None,
+            'latency': latency_percentiles(latencies)}
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) not in (3, 4, 5, 6):
+        print("usage: %s map_filename mesh_filename [count|pairs.csv] [processes] [smooth]" % sys.argv[0])
+        sys.exit(-1)
+
+    queries = sys.argv[3] if len(sys.argv) > 3 else '1000'
+    processes = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+    smooth = len(sys.argv) > 5 and sys.argv[5] not in ('0', 'false', 'False')
+
+    if queries.isdigit():
+        report = run_batch(sys.argv[1], sys.argv[2], count=int(queries), processes=processes, smooth=smooth)
+    else:
+        report = run_batch(sys.argv[1], sys.argv[2], read_pairs(queries), processes=processes, smooth=smooth)
+
+    print("Loaded map and mesh in %.3f s." % report['load_s'])
+    print("Ran %d queries (%d found a path) in %.3f s: %.1f queries/s." % (
+        report['queries'], report['found'], report['seconds'], report['queries_per_s'] or 0.))
+    print("Boxes expanded: %d in all, %.1f per query." % (report['expanded'], report['mean_expanded'] or 0.))
+    print("Latency: " + ', '.join('%s %.2f ms' % (p, latency * 1000) for p, latency in report['latency'].items()))
@@ -0,0 +1,69 @@
+import os
+import sys
+from time import perf_counter
+
+from p2_meshbuilder import build_mesh, split_box, merge_halves, mesh_from_edges, load_map_image
+
+INPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'input')
+MAP_FILENAMES = (os.path.join(INPUT_DIR, 'homer.png'), os.path.join(INPUT_DIR, 'ucsc_banana_slug.png'))
+
+
+def build_mesh_by_slicing(image, min_feature_size):
+    """
+    Builds the same mesh as build_mesh, but tests whether each box is all walkable or all blocked by slicing the
+    image, as build_mesh did before it used summed-area tables
+    """
+    def scan(box):
+
+        x1, x2, y1, y2 = box
+        pixels = image[x1:x2, y1:y2]
+
+        if (x2 - x1) * (y2 - y1) < min_feature_size or (pixels == 255).all() or (pixels == 0).all():
+            return ([box], []) if (pixels == 255).all() else ([], [])
+
+        first_box, second_box, cut, axis = split_box(box)
+        return merge_halves(scan(first_box), scan(second_box), cut, axis)
+
+    boxes, edges = scan((0, image.shape[0], 0, image.shape[1]))
+    return mesh_from_edges(edges, image.shape[:2])
+
+
+def compare_mesh_builders(filenames=MAP_FILENAMES, min_feature_size=16, repeat=3):
+    """
+    Checks that build_mesh and build_mesh_by_slicing give the same boxes and adjacency on each map, and prints
+    the best of repeat timings of each
+
+    Args:
+        filenames: map images to build meshes of
+        min_feature_size: smallest box area split any further, as in p2_meshbuilder
+        repeat: number of builds timed per map and builder
+    """
+    print('%-22s %10s %8s %10s %10s %8s' % ('map', 'pixels', 'boxes', 's slicing', 's table', 'speedup'))
+
+    for filename in filenames:
+        img = load_map_image(filename)
+        times = {}
+        meshes = {}
+        for name, builder in (('slicing', build_mesh_by_slicing), ('table', build_mesh)):
+            best = None
+            for _ in range(repeat):
+                start = perf_counter()
+                meshes[name] = builder(img, min_feature_size)
+                elapsed = perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            times[name] = best
+
+        assert meshes['slicing']['boxes'] == meshes['table']['boxes'], 'Error: the builders gave different boxes.'
+        assert meshes['slicing']['adj'] == meshes['table']['adj'], 'Error: the builders gave different adjacency.'
+
+        print('%-22s %10d %8d %10.3f %10.3f %7.1fx' % (os.path.basename(filename), img.size,
+                                                        len(meshes['table']['boxes']), times['slicing'],
+                                                        times['table'], times['slicing'] / times['table']))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 3:
+        print("usage: %s [map_filename] [min_feature_size]" % sys.argv[0])
+        sys.exit(-1)
+
+    compare_mesh_builders(sys.argv[1:2] or MAP_FILENAMES, *(int(arg) for arg in sys.argv[2:3]))
@@ -0,0 +1,78 @@
+def funnel_path(source_point, destination_point, boxes, segments):
+    """
+    Pulls a path through a corridor of boxes taut, with the simple stupid funnel algorithm
+
+    A funnel is kept from the last corner of the path (its apex) through the portals crossed so far. Each portal
+    narrows one side of the funnel, unless that side would cross the other, in which case the other side's end is a
+    corner of the path and becomes the new apex. The result is the shortest path through the corridor.
+
+    Args:
+        source_point: starting point, inside boxes[0]
+        destination_point: end point, inside boxes[-1]
+        boxes: the corridor, a list of touching (x1, x2, y1, y2) boxes
+        segments: the ((x1, x2), (y1, y2)) portal between each box and the next, one fewer than boxes
+
+    Returns:
+
+        The shortest path (list of points) from source_point to destination_point through the corridor
+    """
+    portals = [portal_sides(box, neighbor, segment) for box, neighbor, segment in zip(boxes, boxes[1:], segments)]
+    portals.append((destination_point, destination_point))
+
+    path = [source_point]
+    apex = left = right = source_point
+    apex_index = left_index = right_index = 0
+
+    i = 0
+    while i < len(portals):
+        next_left, next_right = portals[i]
+        i += 1
+
+        # Try to narrow the funnel's right side; if it would cross the left side, the left side is a corner.
+        if triangle_area2(apex, right, next_right) <= 0:
+            if apex == right or triangle_area2(apex, left, next_right) > 0:
+                right, right_index = next_right, i
+            else:
+                apex, apex_index = left, left_index
+                path.append(apex)
+                left = right = apex
+                left_index = right_index = i = apex_index
+                continue
+
+        # And likewise the left side.
+        if triangle_area2(apex, left, next_left) >= 0:
+            if apex == left or triangle_area2(apex, right, next_left) < 0:
+                left, left_index = next_left, i
+            else:
+                apex, apex_index = right, right_index
+                path.append(apex)
+                left = right = apex
+                left_index = right_index = i = apex_index
+                continue
+
+    if path[-1] != destination_point:
+        path.append(destination_point)
+    return path
+
+
+def portal_sides(box, neighbor, segment):
+    """
+    Orders the ends of the portal from box into neighbor as (left, right), seen by a path crossing it
+    """
+    (x1, x2), (y1, y2) = segment
+    if x1 == x2 and y1 != y2:
+        # A border between rows: going towards larger x, larger y is on the left.
+        ends = (x1, y2), (x1, y1)
+        forward = neighbor[0] >= box[1]
+    else:
+        # A border between columns (or a single shared corner): going towards larger y, smaller x is on the left.
+        ends = (x1, y1), (x2, y2)
+        forward = neighbor[2] >= box[3]
+    return ends if forward else ends[::-1]
+
+
+def triangle_area2(a, b, c):
+    """
+    Returns twice the signed area of the triangle a, b, c: positive when c lies to the left of the line from a to b
+    """
+    return (c[0] - a[0]) * (b[1] - a[1]) - (b[0] - a[0]) * (c[1] - a[1])
@@ -1,5 +1,4 @@
 import collections
-import pickle
 import sys
 import random
 
@@ -7,124 +6,252 @@ from matplotlib.pyplot import imread, imsave
 import numpy
 from numpy import zeros_like
 
+from p2_meshfile import save_mesh_file
+from p2_pathfinder import portal
+from p2_spatial import build_box_index
 
-def build_mesh(image, min_feature_size):
-    def scan(box):
 
-        x1, x2, y1, y2 = box
-        area = (x2 - x1) * (y2 - y1)
+def summed_area_table(mask):
+    """
+    Returns table where table[x, y] counts the true pixels of mask above row x and left of column y
+    """
+    # Summing in place into 32-bit counts, when they cannot overflow, is several times faster than numpy's default.
+    dtype = numpy.int32 if mask.size < 2 ** 31 else numpy.int64
+    table = numpy.zeros((mask.shape[0] + 1, mask.shape[1] + 1), dtype=dtype)
+    numpy.cumsum(mask, axis=1, dtype=dtype, out=table[1:, 1:])
+    numpy.cumsum(table[1:, 1:], axis=0, out=table[1:, 1:])
+    return table
 
-        if area < min_feature_size or (image[x1:x2, y1:y2] == 255).all() or (image[x1:x2, y1:y2] == 0).all():
 
-            # this box is simple enough to handle in one node
-            if (image[x1:x2, y1:y2] == 255).all():
-                return [box], []
-            else:
-                return [], []
+def split_box(box):
+    """
+    Cuts a box in two across its longest side
 
-        else:
+    Returns:
 
-            # recursively split this big box on the longest dimension
-            if x2 - x1 > y2 - y1:
+        The first and second halves, the coordinate of the cut, and the index into the boxes of the coordinate it cuts
+        (0 for a cut across rows, 2 for a cut across columns).
+    """
+    x1, x2, y1, y2 = box
+
+    if x2 - x1 > y2 - y1:
+        cut = int(x1 + (x2 - x1) / 2 + 1)
+        return (x1, cut, y1, y2), (cut, x2, y1, y2), cut, 0
+    else:
+        cut = int(y1 + (y2 - y1) / 2 + 1)
+        return (x1, x2, y1, cut), (x1, x2, cut, y2), cut, 2
 
-                cut = int(x1 + (x2 - x1) / 2 + 1)
-                first_box = (x1, cut, y1, y2)
-                second_box = (cut, x2, y1, y2)
 
-                def rank(b): return (b[2], b[3])
+def merge_halves(first, second, cut, axis):
+    """
+    Joins the boxes and edges found in the two halves of a box made by split_box
 
-                def first_touch(b): return b[1] == cut
+    Boxes lying along the cut on both sides with the same extent are merged into one, and boxes along the cut which
+    overlap the other side's get an edge.
 
-                def second_touch(b): return b[0] == cut
+    Args:
+        first: the (boxes, edges) of the first half
+        second: the (boxes, edges) of the second half
+        cut: the coordinate of the cut
+        axis: the index into the boxes of the coordinate cut, as returned by split_box
 
-            else:
+    Returns:
+
+        The boxes and edges of the whole box.
+    """
+    first_boxes, first_edges = first
+    second_boxes, second_edges = second
+    other = 2 - axis
+
+    def rank(b): return (b[other], b[other + 1])
+
+    def first_touch(b): return b[axis + 1] == cut
+
+    def second_touch(b): return b[axis] == cut
 
-                cut = int(y1 + (y2 - y1) / 2 + 1)
-                first_box = (x1, x2, y1, cut)
-                second_box = (x1, x2, cut, y2)
+    my_boxes = []
+    my_edges = []
 
-                def rank(b): return (b[0], b[1])
+    my_boxes.extend([fb for fb in first_boxes if not first_touch(fb)])
+    my_boxes.extend(
+        [sb for sb in second_boxes if not second_touch(sb)])
 
-                def first_touch(b): return b[3] == cut
+    first_touches = collections.deque(sorted(filter(first_touch, first_boxes), key=rank))
+    second_touches = collections.deque(sorted(
+        filter(second_touch, second_boxes), key=rank))
 
-                def second_touch(b): return b[2] == cut
+    first_merges = {}
+    second_merges = {}
 
-            first_boxes, first_edges = scan(first_box)
-            second_boxes, second_edges = scan(second_box)
+    while first_touches and second_touches:
 
-            my_boxes = []
-            my_edges = []
+        f, s = first_touches[0], second_touches[0]
+        rf, rs = rank(f), rank(s)
 
-            my_boxes.extend([fb for fb in first_boxes if not first_touch(fb)])
-            my_boxes.extend(
-                [sb for sb in second_boxes if not second_touch(sb)])
+        if rf == rs:
 
-            first_touches = sorted(filter(first_touch, first_boxes), key=rank)
-            second_touches = sorted(
-                filter(second_touch, second_boxes), key=rank)
+            first_touches.popleft()
+            second_touches.popleft()
+            merged = (f[0], s[1], f[2], s[3])
+            first_merges[f] = merged
+            second_merges[s] = merged
+            my_boxes.append(merged)
 
-            first_merges = {}
-            second_merges = {}
+        elif rf[1] < rs[1]:
 
-            while first_touches and second_touches:
+            my_boxes.append(first_touches.popleft())
+            if rf[1] >= rs[0]:
+                my_edges.append((f, s))
 
-                f, s = first_touches[0], second_touches[0]
-                rf, rs = rank(f), rank(s)
+        elif rf[1] > rs[1]:
 
-                if rf == rs:
+            my_boxes.append(second_touches.popleft())
+            if rf[0] <= rs[1]:
+                my_edges.append((f, s))
 
-                    first_touches.pop(0)
-                    second_touches.pop(0)
-                    merged = (f[0], s[1], f[2], s[3])
-                    first_merges[f] = merged
-                    second_merges[s] = merged
-                    my_boxes.append(merged)
+        else:
+
+            my_boxes.append(first_touches.popleft())
+            my_boxes.append(second_touches.popleft())
+            my_edges.append((f, s))
 
-                elif rf[1] < rs[1]:
+    my_boxes.extend(first_touches)
+    my_boxes.extend(second_touches)
 
-                    my_boxes.append(first_touches.pop(0))
-                    if rf[1] >= rs[0]:
-                        my_edges.append((f, s))
+    for a, b in first_edges:
+        my_edges.append(
+            (first_merges.get(a, a), first_merges.get(b, b)))
 
-                elif rf[1] > rs[1]:
+    for a, b in second_edges:
+        my_edges.append(
+            (second_merges.get(a, a), second_merges.get(b, b)))
 
-                    my_boxes.append(second_touches.pop(0))
-                    if rf[0] <= rs[1]:
-                        my_edges.append((f, s))
+    return my_boxes, my_edges
 
-                else:
 
-                    my_boxes.append(first_touches.pop(0))
-                    my_boxes.append(second_touches.pop(0))
-                    my_edges.append((f, s))
+def scan_boxes(image, min_feature_size, origin=(0, 0)):
+    """
+    Splits the walkable (255) pixels of an image into boxes and finds which boxes touch
 
-            my_boxes.extend(first_touches)
-            my_boxes.extend(second_touches)
+    Boxes are cut in half along their longest side until they are all walkable, all blocked, or smaller than
+    min_feature_size. Whether a box is all walkable or all blocked is read off summed-area tables in constant time,
+    rather than by scanning its pixels.
 
-            for a, b in first_edges:
-                my_edges.append(
-                    (first_merges.get(a, a), first_merges.get(b, b)))
+    Args:
+        image: the map pixels to split
+        min_feature_size: the smallest area of box that is split any further
+        origin: the (x, y) of the image's first pixel in the whole map, which the boxes returned are placed relative to
 
-            for a, b in second_edges:
-                my_edges.append(
-                    (second_merges.get(a, a), second_merges.get(b, b)))
+    Returns:
 
-            return my_boxes, my_edges
+        The list of walkable (x1, x2, y1, y2) boxes, and the list of (box, box) edges between touching boxes.
+    """
+    # item() returns plain ints, whose arithmetic is much cheaper than numpy's scalars.
+    walkable = summed_area_table(image == 255).item
+    blocked = summed_area_table(image == 0).item
 
-            # end of scan
+    def scan(box):
+
+        x1, x2, y1, y2 = box
+        area = (x2 - x1) * (y2 - y1)
+        walkable_area = walkable(x2, y2) - walkable(x1, y2) - walkable(x2, y1) + walkable(x1, y1)
+        blocked_area = blocked(x2, y2) - blocked(x1, y2) - blocked(x2, y1) + blocked(x1, y1)
+
+        if area < min_feature_size or walkable_area == area or blocked_area == area:
+
+            # this box is simple enough to handle in one node
+            if walkable_area == area:
+                return [box], []
+            else:
+                return [], []
+
+        else:
+
+            # recursively split this big box on the longest dimension
+            first_box, second_box, cut, axis = split_box(box)
+            return merge_halves(scan(first_box), scan(second_box), cut, axis)
 
     boxes, edges = scan((0, image.shape[0], 0, image.shape[1]))
 
+    # Cuts fall at the same offsets into a box wherever it lies, so the image can be scanned from (0, 0) and moved.
+    x0, y0 = origin
+    if x0 or y0:
+        def move(b): return (b[0] + x0, b[1] + x0, b[2] + y0, b[3] + y0)
+
+        boxes = [move(b) for b in boxes]
+        edges = [(move(a), move(b)) for a, b in edges]
+
+    return boxes, edges
+
+
+def mesh_from_edges(edges, shape):
+    """
+    Gathers the edges found by scan_boxes into a mesh of an image with the given (rows, columns) shape
+
+    Returns:
+
+        The mesh (dict): 'boxes' is the list of (x1, x2, y1, y2) boxes with neighbors, 'adj' maps each of them to the
+        list of boxes it touches, 'portals' maps each of them to the list of segments it shares with those boxes (see
+        portal_table), and 'index' locates boxes by point (see p2_spatial).
+    """
     adj = collections.defaultdict(list)
     for a, b in edges:
         adj[a].append(b)
         adj[b].append(a)
 
     mesh = {'boxes': list(adj.keys()), 'adj': dict(adj)}
+    mesh['portals'] = portal_table(mesh['adj'])
+    mesh['index'] = build_box_index(mesh['boxes'], shape)
 
     return mesh
 
 
+def portal_table(adj):
+    """
+    Finds once the segment each box shares with each of its neighbors, so searches only need to look them up
+
+    Args:
+        adj: mesh adjacency, mapping each box to the list of boxes it touches
+
+    Returns:
+
+        A dict mapping each box to the list of ((x1, x2), (y1, y2)) segments it shares with the boxes in its adj list,
+        in the same order
+    """
+    return {box: [portal(box, neighbor) for neighbor in neighbors] for box, neighbors in adj.items()}
+
+
+def build_mesh(image, min_feature_size):
+    """
+    Builds the navigation mesh of a map image, whose walkable pixels are 255 (see scan_boxes)
+    """
+    boxes, edges = scan_boxes(image, min_feature_size)
+    return mesh_from_edges(edges, image.shape[:2])
+
+
+def load_map_image(filename):
+    """
+    Reads a map image as an array of 0-255 pixels, keeping only the first channel of color images
+    """
+    img = (imread(filename) * 255).astype(dtype=numpy.uint8)
+    if len(img.shape) > 2:
+        img = img[:, :, 0]
+    return img
+
+
+def save_mesh(filename, image, mesh):
+    """
+    Writes a mesh file (see p2_meshfile) next to its map image, with a picture of its boxes in random shades
+    """
+    save_mesh_file(mesh, filename + '.mesh')
+
+    atlas = zeros_like(image)
+    for x1, x2, y1, y2 in mesh['boxes']:
+        atlas[x1:x2, y1:y2] = random.randint(64, 255)
+
+    imsave(filename + '.mesh.png', atlas)
+
+
 if __name__ == '__main__':
 
     min_feature_size = 16
@@ -139,22 +266,13 @@ if __name__ == '__main__':
         print("usage: %s map_filename min_feature_size" % sys.argv[0])
         sys.exit(-1)
 
-    img = (imread(filename) * 255).astype(dtype=numpy.uint8)
-    if len(img.shape) > 2:
-        img = img[:, :, 0]
+    img = load_map_image(filename)
 
     mesh = build_mesh(img, min_feature_size)
 
     print(type(mesh))
     print(mesh.keys())
 
-    with open(filename + '.mesh.pickle', 'wb') as f:
-        pickle.dump(mesh, f, protocol=pickle.HIGHEST_PROTOCOL)
-
-    atlas = zeros_like(img)
-    for x1, x2, y1, y2 in mesh['boxes']:
-        atlas[x1:x2, y1:y2] = random.randint(64, 255)
-
-    imsave(filename + '.mesh.png', atlas)
+    save_mesh(filename, img, mesh)
 
     print("Built a mesh with %d boxes." % len(mesh['boxes']))
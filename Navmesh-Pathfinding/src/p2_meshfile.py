@@ -0,0 +1,284 @@
+import pickle
+import struct
+import sys
+from collections.abc import Mapping, Sequence
+from mmap import mmap, ACCESS_READ
+
+import numpy
+
+from p2_pathfinder import portal
+from p2_spatial import build_box_index
+
+MESH_MAGIC = b'NAVM'
+MESH_VERSION = 2
+# magic, version, flags, number of boxes, number of adjacency entries (twice the number of edges)
+MESH_HEADER = struct.Struct('<4sIIII')
+# Flags: box coordinates are float64 rather than int32 (older meshes have fractional ones), portals follow adjacency,
+# three values per adjacency entry, and the point location grid of p2_spatial comes last.
+FLOAT_COORDINATES = 1
+HAS_PORTALS = 2
+HAS_INDEX = 4
+# cell size, rows and columns of the point location grid, and its number of bucket entries
+INDEX_HEADER = struct.Struct('<IIII')
+# Every array starts at a multiple of this many bytes into the file.
+MESH_ALIGNMENT = 8
+
+
+class MeshBoxes(Sequence):
+    """
+    Read-only view of a mesh file's box array as the list of (x1, x2, y1, y2) tuples build_mesh makes
+    """
+
+    def __init__(self, array):
+        self.array = array
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [tuple(box) for box in self.array[i].tolist()]
+        return tuple(self.array[i].tolist())
+
+    def __iter__(self):
+        return (tuple(box) for box in self.array.tolist())
+
+    def __len__(self):
+        return len(self.array)
+
+
+class MeshBuckets(Sequence):
+    """
+    Read-only view of a mesh file's point location grid as the list of per-cell box number lists build_box_index
+    makes, the boxes of the k-th cell being entries[offsets[k]:offsets[k + 1]]
+    """
+
+    def __init__(self, offsets, entries):
+        self.offsets = offsets
+        self.entries = entries
+
+    def __getitem__(self, k):
+        return self.entries[self.offsets[k]:self.offsets[k + 1]].tolist()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+class MeshAdjacency(Mapping):
+    """
+    Read-only view of a mesh file's CSR adjacency as the {box: [neighbor boxes]} dict build_mesh makes
+
+    The neighbors of the i-th box are the boxes numbered neighbors[offsets[i]:offsets[i + 1]]. Each box's range and
+    list are kept once found, so searches over the same part of the mesh only pay for them once.
+    """
+
+    def __init__(self, boxes, offsets, neighbors, index=None):
+        self.boxes = boxes
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.index = index
+        self.ids = None
+        self.rows = {}
+        self.lists = {}
+
+    def box_id(self, box):
+        """
+        Returns the number of a box in the file, raising KeyError for boxes not in the mesh
+        """
+        if self.index is not None:
+            # A box is among those listed in the grid cell of its first corner.
+            index = self.index
+            row, col = int(box[0] // index['cell_size']), int(box[2] // index['cell_size'])
+            if 0 <= row < index['rows'] and 0 <= col < index['cols']:
+                for i in index['buckets'][row * index['cols'] + col]:
+                    if self.boxes[i] == box:
+                        return i
+            raise KeyError(box)
+
+        # Files without a grid number every box on the first lookup.
+        if self.ids is None:
+            self.ids = {b: i for i, b in enumerate(self.boxes)}
+        return self.ids[box]
+
+    def row(self, box):
+        """
+        Returns the range of a box's entries in the neighbors array (and in the portals)
+        """
+        if box not in self.rows:
+            i = self.box_id(box)
+            self.rows[box] = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.rows[box]
+
+    def __getitem__(self, box):
+        if box not in self.lists:
+            start, end = self.row(box)
+            self.lists[box] = [self.boxes[j] for j in self.neighbors[start:end].tolist()]
+        return self.lists[box]
+
+    def __iter__(self):
+        return iter(self.boxes)
+
+    def __len__(self):
+        return len(self.boxes)
+
+
+class MeshPortals(Mapping):
+    """
+    Read-only view of a mesh file's portals as the {box: [((x1, x2), (y1, y2)) segments]} dict build_mesh makes,
+    whose lists line up with those of the adjacency
+
+    Each portal is stored as the (fixed, lo, hi) of its border. The border is a row boundary (x fixed) when the boxes
+    meet along x; boxes meeting along both only share a corner, where the portal is a single point. Version 1 files
+    stored the whole (x1, x2, y1, y2) segment instead.
+    """
+
+    def __init__(self, adj, segments):
+        self.adj = adj
+        self.segments = segments
+        self.lists = {}
+
+    def __getitem__(self, box):
+        if box not in self.lists:
+            start, end = self.adj.row(box)
+            rows = self.segments[start:end].tolist()
+            if self.segments.shape[1] == 4:
+                segments = [((x1, x2), (y1, y2)) for x1, x2, y1, y2 in rows]
+            else:
+                segments = []
+                for neighbor, (fixed, lo, hi) in zip(self.adj[box], rows):
+                    if neighbor[0] == box[1] or neighbor[1] == box[0]:
+                        segments.append(((fixed, fixed), (lo, hi)))
+                    else:
+                        segments.append(((lo, hi), (fixed, fixed)))
+            self.lists[box] = segments
+        return self.lists[box]
+
+    def __iter__(self):
+        return iter(self.adj)
+
+    def __len__(self):
+        return len(self.adj)
+
+
+def save_mesh_file(mesh, filename, portals=True):
+    """
+    Writes a mesh in the binary format read by load_mesh_file
+
+    After a MESH_HEADER come the boxes as an (n, 4) array, the n + 1 adjacency offsets and the adjacency entries as
+    int32, and the portal of each adjacency entry as the (fixed, lo, hi) coordinates of its border (see MeshPortals).
+    Last come an INDEX_HEADER and the point location grid of the boxes (see p2_spatial), as the offsets of each cell's
+    bucket and the box numbers in them. Arrays are little-endian, each starting on a multiple of MESH_ALIGNMENT
+    bytes, and coordinates are int32 if they are all whole, else float64.
+
+    Args:
+        mesh: mesh with 'boxes' and 'adj', and possibly 'portals', as made by build_mesh or loaded from a pickle
+        filename: name of the file to write
+        portals: whether to store the segment each pair of touching boxes shares, found anew if the mesh has none
+    """
+    boxes = list(mesh['boxes'])
+    ids = {box: i for i, box in enumerate(boxes)}
+    offsets = [0]
+    neighbors = []
+    for box in boxes:
+        neighbors.extend(ids[neighbor] for neighbor in mesh['adj'][box])
+        offsets.append(len(neighbors))
+
+    whole = all(float(value).is_integer() for box in boxes for value in box)
+    dtype = numpy.dtype('<i4') if whole else numpy.dtype('<f8')
+    flags = (0 if whole else FLOAT_COORDINATES) | (HAS_PORTALS if portals else 0) | HAS_INDEX
+
+    arrays = [numpy.array(boxes, dtype=dtype).reshape(-1, 4), numpy.array(offsets, dtype='<i4'),
+              numpy.array(neighbors, dtype='<i4')]
+    if portals:
+        if 'portals' in mesh:
+            segments = [segment for box in boxes for segment in mesh['portals'][box]]
+        else:
+            segments = [portal(box, neighbor) for box in boxes for neighbor in mesh['adj'][box]]
+        borders = [(x1, y1, y2) if x1 == x2 else (y1, x1, x2) for (x1, x2), (y1, y2) in segments]
+        arrays.append(numpy.array(borders, dtype=dtype).reshape(-1, 3))
+
+    # Older pickles have no grid; one is built over the boxes, in the order they are written.
+    index = mesh['index'] if 'index' in mesh else build_box_index(boxes)
+    bucket_offsets = [0]
+    for bucket in index['buckets']:
+        bucket_offsets.append(bucket_offsets[-1] + len(bucket))
+    index_header = INDEX_HEADER.pack(index['cell_size'], index['rows'], index['cols'], bucket_offsets[-1])
+    arrays += [index_header, numpy.array(bucket_offsets, dtype='<i4'),
+               numpy.array([i for bucket in index['buckets'] for i in bucket], dtype='<i4')]
+
+    with open(filename, 'wb') as f:
+        f.write(MESH_HEADER.pack(MESH_MAGIC, MESH_VERSION, flags, len(boxes), len(neighbors)))
+        for array in arrays:
+            f.write(b'\0' * (-f.tell() % MESH_ALIGNMENT))
+            f.write(array if isinstance(array, bytes) else array.tobytes())
+
+
+def load_mesh_file(filename):
+    """
+    Reads a mesh written by save_mesh_file
+
+    The file is memory mapped and its arrays are wrapped in views, so loading reads little more than the header;
+    boxes are turned into tuples only as they are used, and found by point or by value through the stored grid.
+
+    Returns:
+
+        A mesh (dict) usable wherever one from build_mesh is: 'boxes' (a MeshBoxes), 'adj' (a MeshAdjacency) and,
+        if the file has them, 'portals' (a MeshPortals) and 'index' (with a MeshBuckets)
+    """
+    with open(filename, 'rb') as f:
+        data = mmap(f.fileno(), 0, access=ACCESS_READ)
+
+    magic, version, flags, box_count, neighbor_count = MESH_HEADER.unpack_from(data)
+    assert magic == MESH_MAGIC, 'Error: not a mesh file.'
+    assert version in (1, MESH_VERSION), 'Error: unsupported mesh file version %d.' % version
+
+    dtype = numpy.dtype('<f8') if flags & FLOAT_COORDINATES else numpy.dtype('<i4')
+    offset = MESH_HEADER.size
+
+    def read(dtype, count):
+        nonlocal offset
+        offset += -offset % MESH_ALIGNMENT
+        array = numpy.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        offset += array.nbytes
+        return array
+
+    boxes = MeshBoxes(read(dtype, box_count * 4).reshape(-1, 4))
+    offsets, neighbors = read('<i4', box_count + 1), read('<i4', neighbor_count)
+    # Version 1 files stored four values per portal.
+    portal_width = 4 if version == 1 else 3
+    segments = read(dtype, neighbor_count * portal_width).reshape(-1, portal_width) if flags & HAS_PORTALS else None
+
+    mesh = {'boxes': boxes}
+    if flags & HAS_INDEX:
+        offset += -offset % MESH_ALIGNMENT
+        cell_size, rows, cols, entry_count = INDEX_HEADER.unpack_from(data, offset)
+        offset += INDEX_HEADER.size
+        buckets = MeshBuckets(read('<i4', rows * cols + 1), read('<i4', entry_count))
+        mesh['index'] = {'cell_size': cell_size, 'rows': rows, 'cols': cols, 'buckets': buckets}
+
+    mesh['adj'] = MeshAdjacency(boxes, offsets, neighbors, mesh.get('index'))
+    if segments is not None:
+        mesh['portals'] = MeshPortals(mesh['adj'], segments)
+    return mesh
+
+
+def load_mesh(filename):
+    """
+    Reads a mesh from either a binary mesh file or an older .mesh.pickle
+    """
+    if filename.endswith('.pickle'):
+        with open(filename, 'rb') as f:
+            return pickle.load(f)
+    return load_mesh_file(filename)
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) < 2:
+        print("usage: %s map.mesh.pickle ..." % sys.argv[0])
+        sys.exit(-1)
+
+    # Converts pickled meshes, such as those in input/, into mesh files alongside them.
+    for pickle_filename in sys.argv[1:]:
+        assert pickle_filename.endswith('.pickle'), 'Error: %s is not a pickle.' % pickle_filename
+        mesh = load_mesh(pickle_filename)
+        mesh_filename = pickle_filename[:-len('.pickle')]
+        save_mesh_file(mesh, mesh_filename)
+        print("Saved file: %s (%d boxes)" % (mesh_filename, len(mesh['boxes'])))
@@ -0,0 +1,83 @@
+import sys
+import pickle
+
+# Side length, in pixels, of the grid cells used to look up which box holds a point.
+INDEX_CELL_SIZE = 16
+
+
+def build_box_index(boxes, shape=None, cell_size=INDEX_CELL_SIZE):
+    """
+    Buckets boxes into a uniform grid, so the box containing a point can be found by checking only the few boxes
+    overlapping that point's grid cell
+
+    Args:
+        boxes: list of (x1, x2, y1, y2) boxes, each covering rows x1 to x2 - 1 and columns y1 to y2 - 1
+        shape: (rows, columns) of the map image, by default just large enough to hold every box
+        cell_size: side length of the grid cells in pixels
+
+    Returns:
+
+        A dict holding the grid's 'cell_size', its number of 'rows' and 'cols', and its 'buckets', a row-major list
+        with, for each grid cell, the list of indices into boxes of the boxes overlapping it
+    """
+    if shape is None:
+        shape = (max((box[1] for box in boxes), default=0), max((box[3] for box in boxes), default=0))
+
+    rows, cols = int(-(-shape[0] // cell_size)), int(-(-shape[1] // cell_size))
+    buckets = [[] for _ in range(rows * cols)]
+
+    for i, (x1, x2, y1, y2) in enumerate(boxes):
+        # Coordinates may be floats in older meshes, so the cells are found by flooring and ceiling.
+        for row in range(int(x1 // cell_size), int(-(-x2 // cell_size))):
+            for col in range(int(y1 // cell_size), int(-(-y2 // cell_size))):
+                buckets[row * cols + col].append(i)
+
+    return {'cell_size': cell_size, 'rows': rows, 'cols': cols, 'buckets': buckets}
+
+
+def locate_box(mesh, point):
+    """
+    Finds the box of the mesh containing a point
+
+    Meshes without an index, such as older pickles and mesh files (see p2_meshfile), get one built (and kept in the
+    mesh) on first use.
+
+    Args:
+        mesh: mesh with 'boxes', and an 'index' from build_box_index unless it is an old pickle
+        point: (x, y) pixel, x being the row as in the boxes
+
+    Returns:
+
+        The (x1, x2, y1, y2) box containing point, or None if point lies outside every box
+    """
+    if 'index' not in mesh:
+        mesh['index'] = build_box_index(mesh['boxes'])
+
+    index, boxes = mesh['index'], mesh['boxes']
+    x, y = point
+    row, col = int(x // index['cell_size']), int(y // index['cell_size'])
+
+    if 0 <= row < index['rows'] and 0 <= col < index['cols']:
+        for i in index['buckets'][row * index['cols'] + col]:
+            x1, x2, y1, y2 = boxes[i]
+            if x1 <= x < x2 and y1 <= y < y2:
+                return boxes[i]
+    return None
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) != 2:
+        print("usage: %s map.mesh.pickle" % sys.argv[0])
+        sys.exit(-1)
+
+    # Adds an index to a mesh pickled before build_mesh stored one.
+    with open(sys.argv[1], 'rb') as f:
+        mesh = pickle.load(f)
+
+    mesh['index'] = build_box_index(mesh['boxes'])
+
+    with open(sys.argv[1], 'wb') as f:
+        pickle.dump(mesh, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    print("Indexed %d boxes in a %d x %d grid." % (len(mesh['boxes']), mesh['index']['rows'], mesh['index']['cols']))
@@ -0,0 +1,71 @@
+import sys
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from p2_meshbuilder import scan_boxes, split_box, merge_halves, mesh_from_edges, load_map_image, save_mesh
+
+# Number of times the image is halved into tiles, giving up to 2 ** TILE_DEPTH tiles.
+TILE_DEPTH = 4
+
+
+def build_mesh_tiled(image, min_feature_size, depth=TILE_DEPTH, processes=None):
+    """
+    Builds the same mesh as build_mesh, scanning tiles of the image in a pool of processes
+
+    The image is cut into tiles exactly as scan_boxes would cut it over its first depth levels, so each tile can be
+    scanned on its own. The boxes and edges of the tiles are then joined across their seams by merge_halves, in the
+    order scan_boxes would have joined them.
+
+    Args:
+        image: the map pixels, 255 where walkable
+        min_feature_size: the smallest area of box that is split any further
+        depth: how many times the image is halved into tiles
+        processes: size of the process pool, by default one per CPU
+
+    Returns:
+
+        The mesh (dict), as returned by build_mesh
+    """
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+
+        def split(box, depth):
+
+            x1, x2, y1, y2 = box
+            tile = image[x1:x2, y1:y2]
+
+            if depth == 0 or (x2 - x1) * (y2 - y1) < min_feature_size or (tile == 255).all() or (tile == 0).all():
+                return executor.submit(scan_boxes, tile, min_feature_size, (x1, y1))
+
+            first_box, second_box, cut, axis = split_box(box)
+            return split(first_box, depth - 1), split(second_box, depth - 1), cut, axis
+
+        def stitch(node):
+
+            if isinstance(node, Future):
+                return node.result()
+
+            first, second, cut, axis = node
+            return merge_halves(stitch(first), stitch(second), cut, axis)
+
+        # Every tile is submitted before any result is waited on, so the whole pool is kept busy.
+        boxes, edges = stitch(split((0, image.shape[0], 0, image.shape[1]), depth))
+
+    return mesh_from_edges(edges, image.shape[:2])
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) not in (2, 3, 4):
+        print("usage: %s map_filename [min_feature_size] [processes]" % sys.argv[0])
+        sys.exit(-1)
+
+    filename = sys.argv[1]
+    min_feature_size = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    img = load_map_image(filename)
+
+    mesh = build_mesh_tiled(img, min_feature_size, processes=processes)
+
+    save_mesh(filename, img, mesh)
+
+    print("Built a mesh with %d boxes." % len(mesh['boxes']))